@@ -0,0 +1,169 @@
+"""
+Benchmark of the memory taken by cached players, comparing the compact layout(slotted Player with PlayerStats records)
+with the previous layout(plain dataclass holding a dict of stats per interval, with several numbers kept as strings).
+
+Run from the src directory:
+    python -m benchmarks.bench_memory                               10,000 players with stats for 3 intervals each
+    python -m benchmarks.bench_memory --players 50000 --intervals 5
+
+Both layouts are filled with the same generated data. For each layout, the benchmark reports the memory allocated for all the players,
+the bytes per player and per interval record, and the size of a pickled player(what the persistent cache stores)
+"""
+from classes.player import Player
+from classes.stat_record import PlayerStats
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Optional
+from util.query_key import QueryKey
+import argparse
+import gc
+import pickle
+import random
+import sys
+import tracemalloc
+
+@dataclass
+class LegacyPlayer:
+    # The Player class as it was before the compact layout, where stats are dicts and age, team ID and achievements are strings
+    id: int
+    name: str
+    real_name: Optional[str]
+    nationality: Optional[str]
+    age: Optional[str]
+    team_id: str
+    team_name: str
+    time_with_team: int
+    time_with_any_team: int
+    achievements: Dict[str, any] = field(default_factory=dict)
+    time_specific_data: Dict[str, any] = field(default_factory=dict)
+    time_specific_fetched_at: Dict[str, float] = field(default_factory=dict)
+
+def generate_players(num_players: int, num_intervals: int) -> list[tuple[dict, dict]]:
+    """
+    Returns the (profile fields, map from (start date, end date) to stats) of every player, generated the same way every run
+    """
+    generator = random.Random(0)
+    intervals = [
+        (date(2025, 1, 1) + timedelta(days=30 * idx), date(2025, 4, 1) + timedelta(days=30 * idx))
+        for idx in range(num_intervals)
+    ]
+
+    players = []
+    for player_id in range(num_players):
+        profile = {
+            "id": player_id,
+            "name": f"player{player_id}",
+            "real_name": f"Real Name {player_id}",
+            "nationality": generator.choice(["Russia", "Denmark", "Brazil", "France", "Ukraine"]),
+            "age": generator.randint(16, 35),
+            "team_id": generator.randint(1, 12000),
+            "team_name": f"team{generator.randint(1, 500)}",
+            "time_with_team": generator.randint(0, 2000),
+            "time_with_any_team": generator.randint(0, 4000),
+            "achievements": {
+                "top20_placements": {},
+                "majors_won": generator.randint(0, 3),
+                "majors_played": generator.randint(0, 10),
+                "lans_won": generator.randint(0, 20),
+                "lans_played": generator.randint(0, 60),
+                "major_mvps": generator.randint(0, 2),
+                "total_mvps": generator.randint(0, 15),
+            },
+        }
+        interval_stats = {}
+        for start_date, end_date in intervals:
+            interval_stats[(start_date, end_date)] = {
+                "firepower": generator.randint(0, 100),
+                "entrying": generator.randint(0, 100),
+                "trading": generator.randint(0, 100),
+                "opening": generator.randint(0, 100),
+                "clutching": generator.randint(0, 100),
+                "sniping": generator.randint(0, 100),
+                "utility": generator.randint(0, 100),
+                "headshot_percentage": round(generator.uniform(20, 70), 1),
+                "kd_ratio": round(generator.uniform(0.5, 1.6), 2),
+                "rounds_played": generator.randint(100, 5000),
+                "adr": round(generator.uniform(50, 110), 1),
+                "kpr": round(generator.uniform(0.4, 1.0), 2),
+                "apr": round(generator.uniform(0.05, 0.2), 2),
+                "dpr": round(generator.uniform(0.5, 0.8), 2),
+                "rating_2.1": round(generator.uniform(0.7, 1.4), 2),
+            }
+        players.append((profile, interval_stats))
+    return players
+
+def parse_value(value):
+    # Builds the value again from its text like a parser would, so that no number object is shared with the generated data
+    return type(value)(str(value))
+
+def build_legacy_player(profile: dict, interval_stats: dict) -> LegacyPlayer:
+    # The parsers used to keep the scraped text for these, and gave rounds played back as a float
+    player = LegacyPlayer(**{
+        **profile,
+        "age": str(profile["age"]),
+        "team_id": str(profile["team_id"]),
+        "achievements": {
+            name: value if isinstance(value, dict) else str(value) for name, value in profile["achievements"].items()
+        },
+    })
+    for (start_date, end_date), stats in interval_stats.items():
+        # Every player's interval string was built on its own by datetime_interval_to_string
+        interval_string = f"{start_date:%Y-%m-%d} to {end_date:%Y-%m-%d}"
+        player.time_specific_data[interval_string] = {
+            **{name: parse_value(value) for name, value in stats.items()},
+            "rounds_played": float(stats["rounds_played"]),
+        }
+        player.time_specific_fetched_at[interval_string] = parse_value(0.0)
+    return player
+
+def build_compact_player(profile: dict, interval_stats: dict) -> Player:
+    player = Player(**profile)
+    for (start_date, end_date), stats in interval_stats.items():
+        key_string = str(QueryKey.create(start_date, end_date))
+        player.time_specific_data[key_string] = PlayerStats({name: parse_value(value) for name, value in stats.items()})
+        player.time_specific_fetched_at[key_string] = parse_value(0.0)
+    return player
+
+def measure(build_player, players: list[tuple[dict, dict]]) -> dict:
+    """
+    Builds every player with build_player and returns the memory allocated for them
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built_players = [build_player(profile, interval_stats) for profile, interval_stats in players]
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    pickled_size = sum(len(pickle.dumps(player, protocol=pickle.HIGHEST_PROTOCOL)) for player in built_players[:1000])
+    return {
+        "total_mb": allocated / (1024 * 1024),
+        "bytes_per_player": allocated / len(built_players),
+        "pickled_bytes_per_player": pickled_size / min(len(built_players), 1000),
+    }
+
+def main() -> int:
+    argument_parser = argparse.ArgumentParser(description="Memory benchmark of the cached player layouts")
+    argument_parser.add_argument("--players", type=int, default=10000, help="Number of players to build")
+    argument_parser.add_argument("--intervals", type=int, default=3, help="Number of intervals of stats each player has")
+    args = argument_parser.parse_args()
+
+    players = generate_players(args.players, args.intervals)
+    results = {
+        "legacy": measure(build_legacy_player, players),
+        "compact": measure(build_compact_player, players),
+    }
+
+    print(f"{args.players} players with stats for {args.intervals} intervals each")
+    print(f"{'layout':<10}{'total MB':>10}{'B/player':>10}{'B/interval':>12}{'pickled B':>11}{'saving':>9}")
+    for layout, result in results.items():
+        saving = 1 - result["total_mb"] / results["legacy"]["total_mb"]
+        print(
+            f"{layout:<10}{result['total_mb']:>10.2f}{result['bytes_per_player']:>10.0f}"
+            f"{result['bytes_per_player'] / max(args.intervals, 1):>12.0f}{result['pickled_bytes_per_player']:>11.0f}{saving:>9.0%}"
+        )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Offline benchmark of the endpoint parsers over the HTML corpus in benchmarks/fixtures.
+No browser or network is used, so parse speed and correctness regressions can be caught anywhere.
+
+Run from the src directory:
+    python -m benchmarks.bench_parsers                      Benchmarks every parser and checks its output against the expected output
+    python -m benchmarks.bench_parsers --update-expected    Rewrites the expected outputs after an intended change to the parsers
+    python -m benchmarks.bench_parsers --import-store DIR   Copies the pages of an HTML store(see HTMLStore) into the corpus
+    python -m benchmarks.bench_parsers --mode fast          Only benchmarks fast parsing(see util/parsing.py), the default is both modes
+
+The corpus has a directory per page type(named after the PageType value), holding pages named {id}_{anything}.html.
+Each page has a {name}.expected.json next to it with the parser's expected output.
+
+For each page type and parsing mode, the benchmark reports the mean and min parse time per page, pages per second, the peak memory
+allocated while parsing a page, and the speedup of fast parsing over the default parsing.
+Both modes are checked against the same expected output
+"""
+from collections.abc import Mapping
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from endpoints.matches import parse_upcoming_matches
+from endpoints.players import parse_player, parse_player_stats
+from endpoints.teams import parse_team, parse_top_teams
+from enums.page_types import PageType
+from util.global_cache import CacheManager
+from util.html_store import HTMLStore
+from util.parsing import enable_fast_parsing
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+fixtures_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Map from page type to the parser benchmarked on its pages. Each parser takes the page's HTML and the ID from the page's file name
+parsers = {
+    PageType.PLAYER: lambda html, page_id: parse_player(html, page_id),
+    PageType.PLAYER_STATS: lambda html, page_id: parse_player_stats(html),
+    PageType.TEAM: lambda html, page_id: parse_team(html, page_id),
+    PageType.TEAM_RANKINGS: lambda html, page_id: parse_top_teams(html, CacheManager.ALL_TIME_INTERVAL),
+    PageType.MATCHES: lambda html, page_id: parse_upcoming_matches(html),
+}
+
+# Used to find the page type of a page imported from an HTML store by its normalized URL
+url_page_type_patterns = [
+    (re.compile(r"/stats/players/(\d+)"), PageType.PLAYER_STATS),
+    (re.compile(r"/stats/teams(?:\?|$)"), PageType.TEAM_RANKINGS),
+    (re.compile(r"/player/(\d+)"), PageType.PLAYER),
+    (re.compile(r"/team/(\d+)"), PageType.TEAM),
+    (re.compile(r"/matches(?:\?|$)"), PageType.MATCHES),
+]
+
+def to_jsonable(value):
+    # Converts a parser's output into something that can be compared with the expected JSON
+    # Datetimes are stored as timestamps, since the parsers build them in the local timezone
+    if is_dataclass(value):
+        return to_jsonable(asdict(value))
+    if isinstance(value, Mapping):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+def load_corpus(page_type: PageType) -> list[tuple[str, int, str]]:
+    """
+    Returns (path, id, html) for every page of the page type in the corpus
+    """
+    page_type_dir = os.path.join(fixtures_dir, page_type.value)
+    if not os.path.isdir(page_type_dir):
+        return []
+
+    pages = []
+    for file_name in sorted(os.listdir(page_type_dir)):
+        if not file_name.endswith(".html"):
+            continue
+        id_match = re.match(r"(\d+)_", file_name)
+        page_id = int(id_match.group(1)) if id_match else 0
+        path = os.path.join(page_type_dir, file_name)
+        with open(path, encoding="utf-8") as f:
+            pages.append((path, page_id, f.read()))
+    return pages
+
+def check_expected(path: str, result, update_expected: bool) -> bool:
+    """
+    Compares the parser's output for a page with its expected output, and returns whether they match
+    """
+    expected_path = path[:-len(".html")] + ".expected.json"
+    actual = to_jsonable(result)
+    if update_expected or not os.path.exists(expected_path):
+        with open(expected_path, "w", encoding="utf-8") as f:
+            json.dump(actual, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return True
+
+    with open(expected_path, encoding="utf-8") as f:
+        expected = json.load(f)
+    if actual != expected:
+        print(f"Parser output for {path} doesn't match {expected_path}")
+        return False
+    return True
+
+def benchmark_page_type(page_type: PageType, repeat: int, update_expected: bool) -> tuple[dict, bool]:
+    """
+    Benchmarks the parser of a page type over its corpus, returning the results and whether every page's output was as expected
+    """
+    parser = parsers[page_type]
+    pages = load_corpus(page_type)
+    if not pages:
+        return None, True
+
+    # Correctness, which also warms up the parser before it's timed
+    all_expected = True
+    for path, page_id, html in pages:
+        all_expected = check_expected(path, parser(html, page_id), update_expected) and all_expected
+
+    # Speed, measured without tracemalloc since tracing allocations slows parsing down a lot
+    parse_times = []
+    for _ in range(repeat):
+        for _, page_id, html in pages:
+            start = time.perf_counter()
+            parser(html, page_id)
+            parse_times.append(time.perf_counter() - start)
+
+    # Peak memory of parsing a single page
+    peak_memory = 0
+    for _, page_id, html in pages:
+        tracemalloc.start()
+        parser(html, page_id)
+        peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    total_time = sum(parse_times)
+    return {
+        "pages": len(pages),
+        "kb_per_page": sum(len(html) for _, _, html in pages) / len(pages) / 1024,
+        "mean_ms": total_time / len(parse_times) * 1000,
+        "min_ms": min(parse_times) * 1000,
+        "pages_per_second": len(parse_times) / total_time,
+        "peak_memory_mb": peak_memory / (1024 * 1024),
+    }, all_expected
+
+def import_store(store_dir: str):
+    """
+    Copies every page of the HTML store whose page type can be told from its URL into the corpus
+    """
+    imported = 0
+    for header, html in HTMLStore(store_dir).iter_pages():
+        for pattern, page_type in url_page_type_patterns:
+            url_match = pattern.search(header["url"])
+            if not url_match:
+                continue
+            page_id = url_match.group(1) if url_match.groups() else "0"
+            name = f"{page_id}_{HTMLStore.get_key(header['url'], header['buttons_to_click'])[:12]}"
+            os.makedirs(os.path.join(fixtures_dir, page_type.value), exist_ok=True)
+            with open(os.path.join(fixtures_dir, page_type.value, f"{name}.html"), "w", encoding="utf-8") as f:
+                f.write(html)
+            imported += 1
+            break
+    print(f"Imported {imported} pages into {fixtures_dir}")
+
+def main() -> int:
+    argument_parser = argparse.ArgumentParser(description="Offline benchmark of the endpoint parsers")
+    argument_parser.add_argument("--repeat", type=int, default=20, help="Number of times every page is parsed when timing")
+    argument_parser.add_argument("--update-expected", action="store_true", help="Rewrite the expected outputs instead of checking them")
+    argument_parser.add_argument("--import-store", metavar="DIR", help="Copy the pages of an HTML store into the corpus and exit")
+    argument_parser.add_argument("--mode", choices=["default", "fast", "both"], default="both", help="Parsing mode(s) to benchmark")
+    args = argument_parser.parse_args()
+
+    if args.import_store:
+        import_store(args.import_store)
+        return 0
+
+    modes = ["default", "fast"] if args.mode == "both" else [args.mode]
+    all_expected = True
+    print(f"{'page type':<16}{'mode':<10}{'pages':>6}{'KB/page':>10}{'mean ms':>10}{'min ms':>10}{'pages/s':>10}{'peak MB':>10}{'speedup':>10}")
+    for page_type in parsers:
+        default_mean_ms = None
+        for mode in modes:
+            enable_fast_parsing(mode == "fast")
+            # Expected outputs are only rewritten from the default mode, so that fast parsing is always checked against it
+            update_expected = args.update_expected and mode == modes[0]
+            results, page_type_expected = benchmark_page_type(page_type, args.repeat, update_expected)
+            all_expected = all_expected and page_type_expected
+            if results is None:
+                print(f"{page_type.value:<16}{mode:<10}{'no pages in the corpus':>30}")
+                continue
+
+            if mode == "default":
+                default_mean_ms = results["mean_ms"]
+            speedup = f"{default_mean_ms / results['mean_ms']:.2f}x" if default_mean_ms else "-"
+            print(
+                f"{page_type.value:<16}{mode:<10}{results['pages']:>6}{results['kb_per_page']:>10.1f}{results['mean_ms']:>10.2f}"
+                f"{results['min_ms']:>10.2f}{results['pages_per_second']:>10.1f}{results['peak_memory_mb']:>10.2f}{speedup:>10}"
+            )
+    enable_fast_parsing(False)
+
+    return 0 if all_expected else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark of the startup cost of a process that only serves cached data.
+Each run is a fresh interpreter, so nothing is already imported or started.
+
+Run from the src directory:
+    python -m benchmarks.bench_startup              Runs the benchmark 5 times and reports the median of every measurement
+    python -m benchmarks.bench_startup --repeat 10
+
+Measured per run:
+    import ms: Time to import hltv
+    construct ms: Time to build an HLTV client
+    first call ms: Time of the first get_player call, for a player that is already in the cache
+    peak RSS MB: Peak resident memory of the process afterwards
+    heavy modules: Which of the fetcher/parser dependencies(selenium, undetected_chromedriver, requests, bs4) ended up imported
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import os
+
+src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+heavy_modules = ["selenium", "undetected_chromedriver", "requests", "bs4"]
+
+# Runs in the fresh interpreter and prints its measurements as JSON
+child_script = f"""
+import json, sys, time
+start = time.perf_counter()
+import hltv
+imported = time.perf_counter()
+
+from classes.player import Player
+from util.global_cache import global_cache, CacheType
+global_cache.set(CacheType.PLAYERS, 1, Player(1, "cached", None, None, None, 0, "", 0, 0))
+
+results = {{"import_ms": (imported - start) * 1000}}
+try:
+    constructing = time.perf_counter()
+    client = hltv.HLTV(1)
+    constructed = time.perf_counter()
+    client.get_player(1)
+    called = time.perf_counter()
+    client.close_connection()
+    results["construct_ms"] = (constructed - constructing) * 1000
+    results["first_call_ms"] = (called - constructed) * 1000
+except Exception as e:
+    results["error"] = f"{{type(e).__name__}}: {{e}}"
+
+try:
+    import resource
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # ru_maxrss is in KB on Linux
+except ImportError:
+    results["peak_rss_mb"] = None # resource is Unix only
+results["heavy_modules"] = [module for module in {heavy_modules!r} if module in sys.modules]
+print(json.dumps(results))
+"""
+
+def run_once() -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", child_script],
+        cwd=src_dir,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise Exception(f"Benchmark run failed:\n{completed.stderr}")
+    # The client can print while starting up, the results are the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def format_median(runs: list[dict], key: str) -> str:
+    values = [run[key] for run in runs if run.get(key) is not None]
+    return f"{statistics.median(values):.1f}" if values else "-"
+
+def main() -> int:
+    argument_parser = argparse.ArgumentParser(description="Benchmark of import time and first-call latency for cache-only workloads")
+    argument_parser.add_argument("--repeat", type=int, default=5, help="Number of fresh processes to measure")
+    args = argument_parser.parse_args()
+
+    runs = [run_once() for _ in range(args.repeat)]
+    print(f"{'import ms':>12}{'construct ms':>14}{'first call ms':>15}{'peak RSS MB':>13}  heavy modules")
+    print(
+        f"{format_median(runs, 'import_ms'):>12}{format_median(runs, 'construct_ms'):>14}{format_median(runs, 'first_call_ms'):>15}"
+        f"{format_median(runs, 'peak_rss_mb'):>13}  {', '.join(runs[-1]['heavy_modules']) or 'none'}"
+    )
+    errors = {run["error"] for run in runs if "error" in run}
+    for error in errors:
+        print(f"Building the client failed: {error}")
+
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+@dataclass
+class BatchResult:
+    id: int # The HLTV ID that was requested
+    value: Any = None # The result for the ID(ex: Player or Team), None if fetching it failed
+    error: Optional[Exception] = None # The error raised while fetching the ID, None if fetching it succeeded
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
@@ -9,4 +9,5 @@ class Match:
     team2: str # Name of the second team playing
     format: str # The format of the match(ex: bo1, bo3, or bo5)
     event: str # The event the match is a part of
-    match_time: datetime # The time the match will be played, represented as a datetime object
+    match_time: datetime # The time the match will be played, represented as a datetime object. Live matches have the time they were parsed at
+    is_live: bool = False # Whether the match is currently being played
@@ -0,0 +1,10 @@
+from classes.match import Match
+from dataclasses import dataclass
+from enums.match_event_types import MatchEventType
+from typing import Optional
+
+@dataclass
+class MatchEvent:
+    type: MatchEventType # What changed about the match
+    match: Match # The match as of this poll, or as of the last poll it was listed in for REMOVED
+    previous: Optional[Match] = None # The match as of the previous poll, None for ADDED
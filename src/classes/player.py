@@ -1,14 +1,16 @@
+from classes.stat_record import PlayerStats
 from dataclasses import dataclass, field
 from typing import Dict, Optional
 
-@dataclass
+# Slotted so that each cached player doesn't carry an instance dict
+@dataclass(slots=True)
 class Player:
     id: int # The player's ID that HLTV has assigned them
     name: str # The player's game name
     real_name: Optional[str] # The player's real name
     nationality: Optional[str] # The player's nationality
     age: Optional[int] # The player's age
-    team_id: int # The HLTV ID of the team the player is currently playing for
+    team_id: Optional[int] # The HLTV ID of the team the player is currently playing for
     team_name: str # The name of the team the player is currently playing for
     time_with_team: int # Number of days the player has been on their current team
     time_with_any_team: int # Number of days the player has been with any team
@@ -27,7 +29,7 @@ class Player:
     achievements: Dict[str, any] = field(default_factory=dict)
 
     """
-    Dictionary containing info about the player over a period of time
+    Dictionary containing info about the player over a period of time, mapping from the string of each query's QueryKey to its PlayerStats
     Current supported data(by sum of all APIs, not each API):
         firepower: Weighted average that represents a player's firepower, from 0-100
         entrying: How likely a player is to be the first one in, from 0-100
@@ -39,10 +41,13 @@ class Player:
         headshot_percentage: The player's total headshot percentage, from 0-100
         kd_ratio: The player's KD ratio
         rounds_played: The player's rounds played
-        dpr: The player's damage per round
+        adr: The player's average damage per round
         kpr: The player's kills per round, from 0-5
         apr: The player's assists per round, from 0-5
         dpr: The player's deaths per round, from 0-1
         rating_2.1: The player's HLTV v2.1 rating, where 1.0 is the average
     """
-    time_specific_data: Dict[str, any] = field(default_factory=dict)
+    time_specific_data: Dict[str, PlayerStats] = field(default_factory=dict)
+
+    # Map from the keys of time_specific_data(the strings of their QueryKeys) to the timestamp they were fetched at, used to know when they go stale
+    time_specific_fetched_at: Dict[str, float] = field(default_factory=dict)
@@ -0,0 +1,83 @@
+from array import array
+from collections.abc import Mapping
+import math
+
+class StatRecord(Mapping):
+    """
+    Read-only mapping from stat name to value holding the stats of one query(ex: a player's stats over an interval),
+    which is what Player.time_specific_data and Team.time_specific_data store for each query.
+
+    The values are kept in a typed array of doubles instead of a dict of boxed numbers, since tens of thousands of these get cached.
+    Each subclass lists its stats and their types in stat_types, where int stats are given back as ints.
+    Stats that weren't scraped are stored as NaN and aren't in the mapping
+    """
+    __slots__ = ("values",)
+    stat_types: dict[str, type] = {} # Map from stat name to its type(int or float), in storage order
+    stat_indexes: dict[str, int] = {} # Map from stat name to its index in values, built from stat_types
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.stat_indexes = {name: idx for idx, name in enumerate(cls.stat_types)}
+
+    def __init__(self, stats: dict = None, **kwargs):
+        self.values = array("d", [math.nan]) * len(self.stat_types)
+        for name, value in {**(stats or {}), **kwargs}.items():
+            if name not in self.stat_indexes:
+                raise KeyError(f"{type(self).__name__} has no stat {name}")
+            if value is not None:
+                self.values[self.stat_indexes[name]] = value
+
+    def __getitem__(self, name: str):
+        value = self.values[self.stat_indexes[name]]
+        if math.isnan(value):
+            raise KeyError(name)
+        return int(value) if self.stat_types[name] is int else value
+
+    def __iter__(self):
+        return (name for name, idx in self.stat_indexes.items() if not math.isnan(self.values[idx]))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)})"
+
+    def __reduce__(self):
+        # Pickled by stat name, so that cached records still load if stats are added or reordered
+        return (type(self), (dict(self),))
+
+class PlayerStats(StatRecord):
+    """
+    A player's stats over a query, see Player.time_specific_data for what each stat is
+    """
+    __slots__ = ()
+    stat_types = {
+        "firepower": int,
+        "entrying": int,
+        "trading": int,
+        "opening": int,
+        "clutching": int,
+        "sniping": int,
+        "utility": int,
+        "headshot_percentage": float,
+        "kd_ratio": float,
+        "rounds_played": int,
+        "adr": float,
+        "kpr": float,
+        "apr": float,
+        "dpr": float,
+        "rating_2.1": float,
+    }
+
+class TeamStats(StatRecord):
+    """
+    A team's stats over a query, see list_top_teams for what each stat is
+    """
+    __slots__ = ()
+    stat_types = {
+        "rank": int,
+        "num_maps_played": int,
+        "kd_diff": int,
+        "kd_ratio": float,
+        "rating": float,
+    }
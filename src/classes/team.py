@@ -1,7 +1,9 @@
+from classes.stat_record import TeamStats
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional
 
-@dataclass
+# Slotted so that each cached team doesn't carry an instance dict
+@dataclass(slots=True)
 class Team:
     id: int # The team's ID that HLTV has assigned it
     name: str # The name of the team
@@ -10,4 +12,4 @@ class Team:
     world_rank: int # The team's current World rank
     players: Dict[str, int] = field(default_factory=dict) # Map from the team's current players' game names to their HLTV IDs
     coach: Dict[str, int] = field(default_factory=dict) # Map from coach's game name to their HLTV ID
-    time_specific_data: Dict[str, any] = field(default_factory=dict) # Dictionary containing info about the team across a period of time(ex: games played)
+    time_specific_data: Dict[str, TeamStats] = field(default_factory=dict) # Dictionary containing info about the team across a period of time(ex: games played), keyed by the string of the query's QueryKey
@@ -0,0 +1,75 @@
+from classes.batch_result import BatchResult
+from endpoints.players import *
+from endpoints.teams import *
+
+# Batch variants of the endpoints, which take a list of IDs instead of a single one
+# Duplicate IDs are only fetched once, cached IDs are served from the cache, and the rest are fetched concurrently on the
+# scraper's thread pool(still within the scraper's rate limit)
+# Results are returned in the order of the input IDs, and an error fetching one ID is stored in its BatchResult instead of failing the batch
+
+def run_batch(scraper: HLTVScraper, ids: list[int], get_cached, fetch) -> list[BatchResult]:
+    """
+    Runs a batch of fetches.
+
+    get_cached: Function taking an ID and returning its cached result, or None if it isn't cached
+    fetch: Function taking an ID and returning its result, called on the scraper's thread pool for the IDs that aren't cached.
+        It shouldn't look the ID up in the cache again(ex: fetch_player instead of get_player), so each ID counts as one lookup in the cache stats
+    """
+    results = {}
+    futures = {}
+    for id in dict.fromkeys(ids): # dict.fromkeys removes duplicates while keeping the input order
+        cached_value = get_cached(id)
+        if cached_value is not None:
+            results[id] = BatchResult(id=id, value=cached_value)
+        else:
+            futures[id] = scraper.submit(fetch, id)
+
+    for id, future in futures.items():
+        try:
+            results[id] = BatchResult(id=id, value=future.result())
+        except Exception as e:
+            print(f"Failed to fetch ID {id} due to error {e}")
+            results[id] = BatchResult(id=id, error=e)
+
+    return [results[id] for id in ids]
+
+def get_players(scraper: HLTVScraper, ids: list[int]) -> list[BatchResult]:
+    """
+    Batch version of get_player, each BatchResult's value is a Player
+    """
+    return run_batch(
+        scraper,
+        ids,
+        lambda id: global_cache.get(CacheType.PLAYERS, id),
+        lambda id: fetch_player(scraper, id)
+    )
+
+def get_player_stats_many(
+        scraper: HLTVScraper,
+        ids: list[int],
+        start_date: datetime = None,
+        end_date: datetime = None,
+        match_type: MatchType = None,
+        maps: list[Maps] = None
+    ) -> list[BatchResult]:
+    """
+    Batch version of get_player_stats, where every player's stats are fetched for the same filters. Each BatchResult's value is a Player
+    """
+    query_key = QueryKey.create(start_date, end_date, match_type, maps)
+    return run_batch(
+        scraper,
+        ids,
+        lambda id: get_cached_player_stats(id, start_date, end_date, match_type, maps),
+        lambda id: fetch_player_stats(scraper, id, None, query_key)
+    )
+
+def get_teams(scraper: HLTVScraper, ids: list[int]) -> list[BatchResult]:
+    """
+    Batch version of get_team, each BatchResult's value is a Team
+    """
+    return run_batch(
+        scraper,
+        ids,
+        get_cached_team,
+        lambda id: fetch_team(scraper, id)
+    )
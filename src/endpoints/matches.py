@@ -1,6 +1,15 @@
 from classes.match import Match
+from classes.match_event import MatchEvent
+from enums.match_event_types import MatchEventType
+from util.parsing import *
 from util.scraper import *
 from datetime import datetime
+from typing import Iterator, TYPE_CHECKING
+import itertools
+import time
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, Tag
 
 hltv_sort_by_time_page_tag = "plausible-event-name=Matches+click+time+match" # All matches in the HLTV matches page sorted by time will have this tag
 
@@ -16,66 +25,198 @@ def get_upcoming_matches(scraper: HLTVScraper, skip_pending_team_matches=False)
     format
     event
     match_time
+    is_live
 
     The results are ordered based on ascending time. If skip_pending_team_matches is set to True, then matches where a team is yet to be decided will be skipped
     """
     buttons = [scraper.cookie_text]
-    soup = scraper.get_website(f"{scraper.default_url}/matches", buttons)
+    soup = scraper.get_website(f"{scraper.default_url}/matches", buttons, PageType.MATCHES)
+    with global_metrics.phase("extract", f"{scraper.default_url}/matches", page_type=PageType.MATCHES):
+        return parse_upcoming_matches(soup, skip_pending_team_matches)
 
-    # Find all divs with class "match"
-    match_divs = soup.find_all("div", class_="match")
+def iter_upcoming_matches(scraper: HLTVScraper, skip_pending_team_matches=False, limit: int = None) -> Iterator[Match]:
+    """
+    Generator version of get_upcoming_matches, which yields each Match as soon as its row is extracted instead of building the whole list.
+    The page is still fetched and parsed into one soup before the first Match is yielded, so this doesn't lower the fetch latency
+    or the memory the soup takes, only the work and memory spent on Match objects that aren't used.
+    limit is the max number of matches to yield(ex: the next 10 matches), None for all of them.
+    Stopping early(breaking out of the loop or reaching the limit) skips extracting the rest of the matches from the soup
+    """
+    buttons = [scraper.cookie_text]
+    soup = scraper.get_website(f"{scraper.default_url}/matches", buttons, PageType.MATCHES)
+    yield from itertools.islice(iter_parse_upcoming_matches(soup, skip_pending_team_matches), limit)
 
-    matches = []
-    for match_div in match_divs:
-        # We are only processing matches in the sorted by time page
-        match_in_sorted_by_time_page = any(
-            hltv_sort_by_time_page_tag in (a.get('class') or [])
-            for a in match_div.find_all('a')
-        )
-        if not match_in_sorted_by_time_page:
-            continue
+def parse_upcoming_matches(page, skip_pending_team_matches=False) -> list[Match]:
+    """
+    Parses HLTV's matches page(/matches) into the list of Matches described in get_upcoming_matches.
+    page is either the page's HTML or the BeautifulSoup parsed from it
+    """
+    return list(iter_parse_upcoming_matches(page, skip_pending_team_matches))
 
-        # Some matches don't have the teams decided yet, in which case the team event will be None
-        # Other matches will have the team be the winner of another match, in which case the team div will be set but there won't be a name
-        team1_div = match_div.find('div', class_='match-team team1')
-        team1_name_div = team1_div.find('div', class_='match-teamname') if team1_div else None
-        team1_name = team1_name_div.get_text(strip=True) if team1_name_div else None
-        team2_div = match_div.find('div', class_='match-team team2')
-        team2_name_div = team2_div.find('div', class_='match-teamname') if team2_div else None
-        team2_name = team2_name_div.get_text(strip=True) if team2_name_div else None
+def iter_parse_upcoming_matches(page, skip_pending_team_matches=False) -> Iterator[Match]:
+    """
+    Generator version of parse_upcoming_matches, which yields the page's Matches in order as each one is extracted from the page's soup.
+    HTML is parsed into the whole soup first
+    """
+    soup = make_soup(page, PageType.MATCHES)
+    for match_div in iter_match_divs(soup):
+        match = parse_match_div(match_div)
 
         # Skipping if one of the teams is undecided and skip_pending_team_matches is set
-        if skip_pending_team_matches and (not team1_name or not team2_name):
+        if skip_pending_team_matches and (not match.team1 or not match.team2):
             continue
+        yield match
+
+def iter_match_divs(soup: "BeautifulSoup") -> Iterator["Tag"]:
+    """
+    Yields the div of every match in the matches page sorted by time, in order
+    """
+    # Walks the divs with class "match" one at a time instead of collecting all of them upfront, so stopping early skips searching the rest of the soup
+    next_match_div = soup.find("div", class_="match")
+    while next_match_div is not None:
+        match_div = next_match_div
+        next_match_div = match_div.find_next("div", class_="match")
+
+        # We are only processing matches in the sorted by time page
+        if match_div.find('a', class_=hltv_sort_by_time_page_tag) is not None:
+            yield match_div
+
+def get_match_link(match_div: "Tag") -> str:
+    # HLTV link for the match, which is what identifies it
+    return HLTVScraper.default_url + match_div.find('a', href=lambda x: x and x.startswith('/matches/'))['href']
+
+def get_match_fingerprint(match_div: "Tag") -> int:
+    """
+    Returns a hash of the content of a match's div that parse_match_div reads(its text, time and event),
+    which changes whenever the match's Match would. Much cheaper than parsing the div or hashing its HTML
+    """
+    # A single walk over the div's nodes, taking the text nodes as they are and the attributes the time and event are read from
+    return hash(tuple(
+        node if isinstance(node, str) else (node.attrs.get("data-unix"), node.attrs.get("data-event-headline"))
+        for node in match_div.descendants
+    ))
+
+def parse_match_div(match_div: "Tag") -> Match:
+    """
+    Parses the div of a match in the matches page into its Match
+    """
+    # Some matches don't have the teams decided yet, in which case the team event will be None
+    # Other matches will have the team be the winner of another match, in which case the team div will be set but there won't be a name
+    team1_div = match_div.find('div', class_='match-team team1')
+    team1_name_div = team1_div.find('div', class_='match-teamname') if team1_div else None
+    team1_name = team1_name_div.get_text(strip=True) if team1_name_div else None
+    team2_div = match_div.find('div', class_='match-team team2')
+    team2_name_div = team2_div.find('div', class_='match-teamname') if team2_div else None
+    team2_name = team2_name_div.get_text(strip=True) if team2_name_div else None
+
+    # Type of the match
+    match_format = match_div.find('div', class_='match-meta').get_text(strip=True)
+
+    # Time of the match, which HLTV displays in your local time, represented as a Python datetime object
+    match_is_live_div = match_div.find('div', class_="match-meta match-meta-live")
+    match_is_live = match_is_live_div is not None and match_is_live_div.get_text(strip=True) == "Live"
+    if match_is_live: # Setting live matches' time to now
+        match_time = datetime.now()
+    else:
+        match_time_div = match_div.find('div', class_='match-time')
+        match_time = datetime.fromtimestamp(float(match_time_div["data-unix"]) / 1000) # Need to convert ms to seconds
+
+    # Event name for the match
+    event_div = match_div.find('div', class_="match-event")
+    event = event_div.get("data-event-headline") if event_div else None
+
+    return Match(
+        match_link=get_match_link(match_div),
+        team1=team1_name,
+        team2=team2_name,
+        format=match_format,
+        event=event,
+        match_time=match_time,
+        is_live=match_is_live
+    )
+
+class MatchWatcher:
+    """
+    Keeps the last snapshot of the upcoming matches and turns each new matches page into the MatchEvents of what changed since.
+
+    Every match's div is fingerprinted by its match link plus a hash of its content(see get_match_fingerprint), and only divs whose
+    hash changed since the previous page are parsed again, so a page where nothing changed costs a hash per match and gives no events.
+    The first page gives an ADDED event for every match
+    """
+    matches: dict[str, Match] # Map from match link to the match as of the last page, in the page's order
+    fingerprints: dict[str, int] # Map from match link to the hash of the match's div as of the last page
+
+    def __init__(self):
+        self.matches = {}
+        self.fingerprints = {}
+
+    def update(self, page) -> list[MatchEvent]:
+        """
+        Parses the matches page(the page's HTML or the BeautifulSoup parsed from it) into the snapshot and returns the events since the last page
+        """
+        soup = make_soup(page, PageType.MATCHES)
+        with global_metrics.phase("extract", page_type=PageType.MATCHES):
+            return self._update(soup)
+
+    def _update(self, soup: "BeautifulSoup") -> list[MatchEvent]:
+        events = []
+        matches = {}
+        fingerprints = {}
+        for match_div in iter_match_divs(soup):
+            match_link = get_match_link(match_div)
+            fingerprint = get_match_fingerprint(match_div)
+            fingerprints[match_link] = fingerprint
+
+            # Unchanged matches keep their Match from the last page, which also keeps live matches' time from moving
+            if self.fingerprints.get(match_link) == fingerprint:
+                matches[match_link] = self.matches[match_link]
+                continue
+
+            global_metrics.increment("match_watch.parsed")
+            match = parse_match_div(match_div)
+            matches[match_link] = match
+            previous = self.matches.get(match_link)
+            events.extend(get_match_events(previous, match))
+
+        for match_link, previous in self.matches.items():
+            if match_link not in matches:
+                events.append(MatchEvent(MatchEventType.REMOVED, previous, previous))
+
+        self.matches = matches
+        self.fingerprints = fingerprints
+        return events
+
+def get_match_events(previous: Match, match: Match) -> list[MatchEvent]:
+    """
+    Returns the events between two versions of a match, where previous is None if the match is new
+    Changes that have no event(ex: the event's name) give an empty list
+    """
+    if previous is None:
+        return [MatchEvent(MatchEventType.ADDED, match)]
+
+    events = []
+    if match.is_live and not previous.is_live:
+        events.append(MatchEvent(MatchEventType.WENT_LIVE, match, previous))
+    elif not match.is_live and match.match_time != previous.match_time:
+        events.append(MatchEvent(MatchEventType.RESCHEDULED, match, previous))
+    if (match.team1 and not previous.team1) or (match.team2 and not previous.team2):
+        events.append(MatchEvent(MatchEventType.TEAMS_DECIDED, match, previous))
+    return events
+
+def watch_upcoming_matches(scraper: HLTVScraper, poll_interval: float = 60, max_polls: int = None) -> Iterator[MatchEvent]:
+    """
+    Polls HLTV's upcoming matches every poll_interval seconds and yields a MatchEvent for each change, see MatchWatcher.
+    The first poll yields an ADDED event for every listed match. Polls where nothing changed yield nothing.
+    Runs until the caller stops iterating, or for max_polls polls if it's set
+    """
+    watcher = MatchWatcher()
+    poll = 0
+    while max_polls is None or poll < max_polls:
+        if poll:
+            time.sleep(poll_interval)
+        yield from watcher.update(get_matches_page(scraper, refresh=True))
+        poll += 1
 
-        # Type of the match
-        match_format = match_div.find('div', class_='match-meta').get_text(strip=True)
-
-        # Time of the match, which HLTV displays in your local time, represented as a Python datetime object
-        match_is_live = match_div.find('div', class_="match-meta match-meta-live")
-        if match_is_live is not None and match_is_live.get_text(strip=True) == "Live": # Setting live matches' time to now
-            match_time = datetime.now()
-        else:
-            match_time_div = match_div.find('div', class_='match-time')
-            match_time = datetime.fromtimestamp(float(match_time_div["data-unix"]) / 1000) # Need to convert ms to seconds
-
-        # HLTV link for the match
-        match_link = scraper.default_url + match_div.find('a', href=lambda x: x and x.startswith('/matches/'))['href']
-
-        # Event name for the match
-        event_div = match_div.find('div', class_="match-event")
-        event = event_div.get("data-event-headline") if event_div else None
-
-        # Adding the match to the list
-        matches.append(
-            Match(
-                match_link=match_link,
-                team1=team1_name,
-                team2=team2_name,
-                format=match_format,
-                event=event,
-                match_time=match_time
-            )
-        )
-
-    return matches
+def get_matches_page(scraper: HLTVScraper, refresh: bool = False) -> "BeautifulSoup":
+    # Polls refresh the page, since serving a stored copy of it would hide the changes they're polling for
+    return scraper.get_website(f"{scraper.default_url}/matches", [scraper.cookie_text], PageType.MATCHES, refresh)
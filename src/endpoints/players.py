@@ -1,7 +1,10 @@
 from classes.player import Player
+from classes.stat_record import PlayerStats
 from enums.maps import Maps
 from enums.match_types import MatchType
 from util.global_cache import *
+from util.name_index import *
+from util.parsing import *
 from util.scraper import *
 from util.url_util import *
 import re
@@ -15,12 +18,60 @@ def get_player(scraper: HLTVScraper, id: int, player_name: str = None) -> Player
     cached_player = global_cache.get(CacheType.PLAYERS, id)
     if cached_player:
         return cached_player
+    return fetch_player(scraper, id, player_name)
 
+def fetch_player(scraper: HLTVScraper, id: int, player_name: str = None) -> Player:
+    """
+    Fetches and caches the player without looking them up in the cache first, for callers that already did(ex: batches),
+    so that the lookup is only counted once in the cache stats
+    """
+    # Concurrent calls for the same player(ex: a get_player_stats miss while the player is being fetched) wait for one fetch
+    return scraper.entity_flight.do((CacheType.PLAYERS, id), _fetch_player, scraper, id, player_name)
+
+def _fetch_player(scraper: HLTVScraper, id: int, player_name: str) -> Player:
     # The player name doesn't matter, it's just for logging purposes. Only the ID matters
     url = f"{scraper.default_url}/player/{id}/{player_name if player_name else "random"}"
 
     buttons = [scraper.cookie_text]
-    soup = scraper.get_website(url, buttons)
+    soup, fetched_at = scraper.get_page(url, buttons, PageType.PLAYER)
+    with global_metrics.phase("extract", url, page_type=PageType.PLAYER):
+        player = parse_player(soup, id)
+    global_name_index.add(IndexType.PLAYERS, player.id, player.name, [player.real_name])
+    global_name_index.add(IndexType.TEAMS, player.team_id, player.team_name)
+
+    # Adding the player to the cache before returning
+    # The page has the player's current info, so it replaces the cached one, but the stats that get_player_stats
+    # may have added to the cached player meanwhile are kept instead of being overwritten
+    def keep_cached_stats(cached_player: Player) -> Player:
+        if cached_player is not None:
+            player.time_specific_data = {**cached_player.time_specific_data, **player.time_specific_data}
+            player.time_specific_fetched_at = {**cached_player.time_specific_fetched_at, **player.time_specific_fetched_at}
+        return player
+    # The player's TTL counts from when the page was fetched, since that's how old the player's info is
+    player = global_cache.update(CacheType.PLAYERS, id, keep_cached_stats, fetched_at)
+    if scraper.prefetcher:
+        scraper.prefetcher.add_related_to_player(player)
+
+    return player
+
+def get_player_by_name(scraper: HLTVScraper, name: str) -> Player:
+    """
+    Returns info for the player with the given name or real name(case-insensitive), the same as get_player.
+    The ID is looked up in the name index(see NameIndex), which knows every player seen on a team roster(get_team) or profile(get_player)
+
+    Raises KeyError if the name index hasn't seen a player with the name yet
+    """
+    player_id = global_name_index.get_id(IndexType.PLAYERS, name)
+    if player_id is None:
+        raise KeyError(f"No player named {name} has been seen yet, get the team they play for first or look them up by ID")
+    return get_player(scraper, player_id, name)
+
+def parse_player(page, id: int) -> Player:
+    """
+    Parses a player's profile page(/player/{id}/{name}) into a Player.
+    page is either the page's HTML or the BeautifulSoup parsed from it
+    """
+    soup = make_soup(page, PageType.PLAYER)
 
     # High level divs
     player_profile_div = soup.find("div", class_="playerProfile")
@@ -35,12 +86,12 @@ def get_player(scraper: HLTVScraper, id: int, player_name: str = None) -> Player
 
     # Player general info
     player_info_div = player_info_wrapper_div.find("div", class_="playerInfo")
-    age = re.search(r'\d+', player_info_div.find('span', itemprop='text').get_text(strip=True)).group()
+    age = int(re.search(r'\d+', player_info_div.find('span', itemprop='text').get_text(strip=True)).group())
 
     # Player team info
     player_team_info_div = player_info_div.find('div', class_='playerInfoRow playerTeam')
     team_anchor = player_team_info_div.find("span", itemprop="text").find("a")
-    team_id = re.search(r'/team/(\d+)/', team_anchor['href']).group(1)
+    team_id = int(re.search(r'/team/(\d+)/', team_anchor['href']).group(1))
     team_name = team_anchor.get_text(strip=True)
 
     # Player top20 info
@@ -86,7 +137,7 @@ def get_player(scraper: HLTVScraper, id: int, player_name: str = None) -> Player
             if plural_form in stat_description:
                 stat_description = stat_description.replace(plural_form, singular_form)
 
-            stat_value = highlighted_stats_div.find('div', class_='stat').get_text(strip=True)
+            stat_value = int(highlighted_stats_div.find('div', class_='stat').get_text(strip=True).replace(',', ''))
             result[stat_description] = stat_value
         return result
 
@@ -129,7 +180,7 @@ def get_player(scraper: HLTVScraper, id: int, player_name: str = None) -> Player
         "total_mvps": total_mvps
     }
     
-    player = Player(
+    return Player(
         id=id,
         name=name,
         real_name=real_name,
@@ -142,10 +193,25 @@ def get_player(scraper: HLTVScraper, id: int, player_name: str = None) -> Player
         achievements=achievements,
     )
 
-    # Adding the player to the cache before returning
-    global_cache.set(CacheType.PLAYERS, id, player)
-
-    return player
+def get_cached_player_stats(
+        id: int,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        match_type: MatchType = None,
+        maps: list[Maps] = None
+    ) -> Player:
+    """
+    Returns the cached player if it already has fresh stats for the input filters(see CacheManager.is_interval_fresh), otherwise None.
+    """
+    query_key = QueryKey.create(start_date, end_date, match_type, maps)
+    player = global_cache.get(CacheType.PLAYERS, id)
+    if player and str(query_key) in player.time_specific_data:
+        fetched_at = player.time_specific_fetched_at.get(str(query_key))
+        if global_cache.is_interval_fresh(query_key, fetched_at):
+            global_metrics.increment("query_cache.hit", query_key=str(query_key))
+            return player
+    global_metrics.increment("query_cache.miss", query_key=str(query_key))
+    return None
 
 def get_player_stats(
         scraper: HLTVScraper,
@@ -159,23 +225,64 @@ def get_player_stats(
     """
     Gets the full player's stats for the input time interval and returns the Player object.
     """
-    interval_string = CacheManager.datetime_interval_to_string(start_date, end_date) # String representing the time interval we're scraping this data for
+    query_key = QueryKey.create(start_date, end_date, match_type, maps) # The filters we're scraping this data for
+
+    # We skip if the player already has the data
+    cached_player = get_cached_player_stats(id, start_date, end_date, match_type, maps)
+    if cached_player:
+        return cached_player
+    return fetch_player_stats(scraper, id, player_name, query_key)
+
+def fetch_player_stats(scraper: HLTVScraper, id: int, player_name: str, query_key: QueryKey) -> Player:
+    """
+    Fetches and caches the player's stats for the query without looking them up in the cache first, see fetch_player
+    """
+    # Concurrent calls for the same player's stats over the same query wait for one fetch
+    return scraper.entity_flight.do(
+        (CacheType.PLAYERS, id, str(query_key)),
+        _fetch_player_stats,
+        scraper,
+        id,
+        player_name,
+        query_key
+    )
 
+def _fetch_player_stats(scraper: HLTVScraper, id: int, player_name: str, query_key: QueryKey) -> Player:
     # Fetch the player object if not in the cache
-    player = global_cache.get(CacheType.PLAYERS, id)
-    if player:
-        # We skip if the player already has the data
-        # We process it for all time interval again though, as it could be different from when we last processed it
-        if interval_string != CacheManager.ALL_TIME_INTERVAL and interval_string in player.time_specific_data:
-            return player
-    else:
-        player = get_player(scraper, id, player_name)
+    # get_cached_player_stats already counted the lookup of the player, so it isn't counted again
+    player = global_cache.get(CacheType.PLAYERS, id, count=False)
+    if not player:
+        player = fetch_player(scraper, id, player_name)
 
     url = f"{scraper.default_url}/stats/players/{id}/{player_name if player_name else "random"}"
-    url += URLUtil.get_end_of_url(start_date, end_date, match_type, maps)
+    url += URLUtil.get_end_of_url(query_key)
 
+    # Stats for the query that are cached but went stale were parsed from a page at least as old as the stored one, so it's fetched again
     buttons = [scraper.cookie_text]
-    soup = scraper.get_website(url, buttons)
+    refresh = str(query_key) in player.time_specific_data
+    soup, fetched_at = scraper.get_page(url, buttons, PageType.PLAYER_STATS, refresh)
+
+    # The stats are as old as the page they were parsed from, which may be older than now if it came from the HTML store
+    with global_metrics.phase("extract", url, page_type=PageType.PLAYER_STATS):
+        stats = parse_player_stats(soup)
+
+    # Storing the stats into a copy of the cached player's data dictionary, so threads reading the cached player never see it change
+    def add_stats(cached_player: Player) -> Player:
+        # The player we fetched above is used if it's no longer cached(ex: it got evicted)
+        new_player = cached_player if cached_player is not None else CacheManager.copy_dataclass(player)
+        new_player.time_specific_data[str(query_key)] = stats
+        new_player.time_specific_fetched_at[str(query_key)] = fetched_at
+        return new_player
+
+    # Storing the player with the additional stats into the cache
+    return global_cache.update(CacheType.PLAYERS, id, add_stats)
+
+def parse_player_stats(page) -> PlayerStats:
+    """
+    Parses a player's stats page(/stats/players/{id}/{name}) into the PlayerStats stored in Player.time_specific_data for its query.
+    page is either the page's HTML or the BeautifulSoup parsed from it
+    """
+    soup = make_soup(page, PageType.PLAYER_STATS)
 
     role_stats_container_div = soup.find("div", class_="role-stats-container standard-box")
 
@@ -210,8 +317,7 @@ def get_player_stats(
         stat_value = float(spans[1].get_text(strip=True).replace('%', ''))
         stat_title_to_value_map[stat_title] = stat_value
 
-    # Storing the stats into the player's data dictionary
-    player.time_specific_data[interval_string] = {
+    return PlayerStats({
         "firepower": firepower,
         "entrying": stat_title_to_value_map["Entrying"],
         "trading": stat_title_to_value_map["Trading"],
@@ -222,14 +328,9 @@ def get_player_stats(
         "headshot_percentage": stat_title_to_value_map["Headshot %"],
         "kd_ratio": stat_title_to_value_map["K/D Ratio"],
         "rounds_played": stat_title_to_value_map["Rounds played"],
-        "dpr": stat_title_to_value_map["Damage / Round"],
+        "adr": stat_title_to_value_map["Damage / Round"],
         "kpr": stat_title_to_value_map["Kills / round"],
         "apr": stat_title_to_value_map["Assists / round"],
         "dpr": stat_title_to_value_map["Deaths / round"],
         "rating_2.1": stat_title_to_value_map["Rating 2.1"]
-    }
-
-    # Storing the player with the additional stats into the cache
-    global_cache.set(CacheType.PLAYERS, id, player)
-
-    return player
+    })
@@ -0,0 +1,171 @@
+from endpoints.players import *
+from endpoints.teams import *
+from enum import Enum
+import heapq
+import itertools
+import threading
+
+class PrefetchKind(Enum):
+    PLAYER = "player" # get_player
+    TEAM = "team" # get_team
+    PLAYER_STATS = "player_stats" # get_player_stats over all time
+
+class PrefetchScheduler:
+    """
+    Background thread that fetches the entities related to the pages the scraper parses, so that the calls that usually follow are cache hits.
+
+    When a team is fetched, its players are queued, and when a player is fetched, their team and their all time stats are queued.
+    Coaches aren't queued, since their IDs are coach IDs(/coach/{id}) that get_player would fetch a different person for.
+    Queued entities are fetched one at a time through the same endpoints as the user's calls, but each fetch only takes its tokens(its full
+    weight, ex: a navigation plus button clicks) once the rate limiter has that many left over, and takes them atomically(see acquire_leftover).
+    So a prefetch never queues ahead of a user's call that is waiting, and a user's call made right after one waits for at most one prefetch's worth of tokens.
+
+    Entities are fetched in priority order: shallower first, and at the same depth players before teams before stats, in the order they were queued.
+    An entity the user asked for is at depth 0, and the entities related to one at depth d are at depth d + 1, up to max_depth.
+    Stats are at the depth of their player, since they're the same entity. Entities that are queued or already cached aren't queued again
+    """
+    scraper: HLTVScraper
+    max_depth: int
+    max_queue_size: int # Entities queued once the queue is this long are dropped
+    idle_interval: float # Number of seconds to wait before checking the rate limiter again when it doesn't have a fetch's tokens left over
+    queue: list # Heap of (depth, kind priority, sequence number, kind, ID)
+    queued: set # (kind, ID) of the queued entities
+    sequence: itertools.count # Breaks ties between entities of the same priority in the order they were queued
+    condition: threading.Condition
+    stopped: bool
+    thread: threading.Thread
+    current_depth: threading.local # Depth of the entity the prefetch thread is fetching, so the entities found on its page are one level deeper
+
+    # Order of the kinds of entities at the same depth, where lower is fetched first
+    kind_priorities = {
+        PrefetchKind.PLAYER: 0,
+        PrefetchKind.TEAM: 1,
+        PrefetchKind.PLAYER_STATS: 2,
+    }
+
+    def __init__(
+            self,
+            scraper: HLTVScraper,
+            max_depth: int = 1,
+            max_queue_size: int = 1000,
+            idle_interval: float = 0.1
+    ):
+        self.scraper = scraper
+        self.max_depth = max_depth
+        self.max_queue_size = max_queue_size
+        self.idle_interval = idle_interval
+        self.queue = []
+        self.queued = set()
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.current_depth = threading.local()
+        self.thread = threading.Thread(target=self._run, name="hltv-prefetch", daemon=True)
+
+    def start(self):
+        self.scraper.prefetcher = self
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the prefetch thread once the fetch it's making(if any) finishes, and drops everything still queued
+        """
+        if self.scraper.prefetcher is self:
+            self.scraper.prefetcher = None
+        with self.condition:
+            self.stopped = True
+            self.queue.clear()
+            self.queued.clear()
+            self.condition.notify_all()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def is_prefetch_thread(self) -> bool:
+        return threading.current_thread() is self.thread
+
+    def acquire_leftover(self, weight: float, route: str):
+        """
+        Blocks until the rate limiter has weight tokens left over for the route and takes them, which the scraper does instead of
+        RateLimitedExecutor.acquire for the fetches of the prefetch thread. Once stopped, the fetch in progress waits for its tokens like any call
+        """
+        with self.condition:
+            while not self.stopped:
+                if self.scraper.rate_limiter.try_acquire(weight, route):
+                    return
+                self.condition.wait(self.idle_interval)
+        self.scraper.rate_limiter.acquire(weight, route)
+
+    def _get_depth(self) -> int:
+        # Entities parsed outside of the prefetch thread are ones the user asked for
+        return getattr(self.current_depth, "depth", 0)
+
+    def add_related_to_team(self, team: Team):
+        """
+        Queues the players of a team that was just fetched
+        """
+        depth = self._get_depth() + 1
+        for player_id in team.players.values():
+            self.enqueue(PrefetchKind.PLAYER, player_id, depth)
+
+    def add_related_to_player(self, player: Player):
+        """
+        Queues the all time stats and the team of a player who was just fetched
+        """
+        depth = self._get_depth()
+        self.enqueue(PrefetchKind.PLAYER_STATS, player.id, depth)
+        if player.team_id is not None:
+            self.enqueue(PrefetchKind.TEAM, player.team_id, depth + 1)
+
+    def enqueue(self, kind: PrefetchKind, id: int, depth: int):
+        if depth > self.max_depth or self._is_cached(kind, id):
+            return
+        with self.condition:
+            if self.stopped or (kind, id) in self.queued or len(self.queue) >= self.max_queue_size:
+                return
+            heapq.heappush(self.queue, (depth, PrefetchScheduler.kind_priorities[kind], next(self.sequence), kind, id))
+            self.queued.add((kind, id))
+            self.condition.notify()
+        global_metrics.increment("prefetch.enqueued", kind=kind)
+
+    @staticmethod
+    def _is_cached(kind: PrefetchKind, id: int) -> bool:
+        # The scheduler's checks don't count as cache hits or misses. They look in the persistent tier too, since
+        # the fetch_* endpoints the scheduler calls don't, and an entity that's only in the DB doesn't need a fetch
+        if kind == PrefetchKind.TEAM:
+            return has_team_profile(global_cache.get(CacheType.TEAMS, id, count=False))
+        player = global_cache.get(CacheType.PLAYERS, id, count=False)
+        if kind == PrefetchKind.PLAYER:
+            return player is not None
+        query_key = QueryKey.create()
+        return (
+            player is not None
+            and str(query_key) in player.time_specific_data
+            and global_cache.is_interval_fresh(query_key, player.time_specific_fetched_at.get(str(query_key)))
+        )
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and not self.queue:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                depth, _, _, kind, id = heapq.heappop(self.queue)
+                self.queued.discard((kind, id))
+
+            # It may have been fetched by the user since it was queued
+            if self._is_cached(kind, id):
+                continue
+
+            self.current_depth.depth = depth
+            try:
+                if kind == PrefetchKind.PLAYER:
+                    fetch_player(self.scraper, id)
+                elif kind == PrefetchKind.TEAM:
+                    fetch_team(self.scraper, id)
+                else:
+                    fetch_player_stats(self.scraper, id, None, QueryKey.create())
+                global_metrics.increment("prefetch.fetched", kind=kind)
+            except Exception as e:
+                print(f"Failed to prefetch {kind.value} {id} due to error {e}")
+                global_metrics.increment("prefetch.failed", kind=kind)
@@ -1,10 +1,15 @@
+from classes.stat_record import TeamStats
 from classes.team import Team
 from enums.maps import Maps
 from enums.match_types import MatchType
 from util.global_cache import *
+from util.name_index import *
+from util.parsing import *
 from util.scraper import *
 from util.url_util import *
 from datetime import datetime, timedelta
+from typing import Iterator
+import itertools
 import re
 
 # THERE IS ALSO A DIFFERENT PAGE FOR GETTING TEAMS AT A SPECIFIC POINT IN TIME
@@ -20,15 +25,85 @@ def get_team(scraper: HLTVScraper, id: int, team_name: str = None) -> Team:
     
     Returned Team class will have the following fields:
     """
-    cached_team = global_cache.get(CacheType.TEAMS, id)
+    cached_team = get_cached_team(id)
     if cached_team:
         return cached_team
+    return fetch_team(scraper, id, team_name)
+
+def fetch_team(scraper: HLTVScraper, id: int, team_name: str = None) -> Team:
+    """
+    Fetches and caches the team without looking it up in the cache first, for callers that already did(ex: batches),
+    so that the lookup is only counted once in the cache stats
+    """
+    # Concurrent calls for the same team(ex: two callers loading the same roster) wait for one fetch
+    return scraper.entity_flight.do((CacheType.TEAMS, id), _fetch_team, scraper, id, team_name)
+
+def has_team_profile(team: Team) -> bool:
+    # Teams cached from the rankings page(see list_top_teams) only have their name, rank and stats, the roster comes from the team's own page
+    return team is not None and bool(team.players or team.coach)
+
+def get_cached_team(id: int) -> Team:
+    """
+    Returns the cached team if it has the info from the team's page(as get_team returns it), otherwise None.
+    A team only cached from the rankings page counts as not cached, so that get_team fetches its roster
+    """
+    cached_team = global_cache.get(CacheType.TEAMS, id)
+    return cached_team if has_team_profile(cached_team) else None
 
+def _fetch_team(scraper: HLTVScraper, id: int, team_name: str) -> Team:
     # The team name doesn't matter, it's just for logging purposes. Only the ID matters
     url = f"{scraper.default_url}/team/{id}/{team_name if team_name else "random"}"
 
     buttons = [scraper.cookie_text]
-    soup = scraper.get_website(url, buttons)
+    soup, fetched_at = scraper.get_page(url, buttons, PageType.TEAM)
+    with global_metrics.phase("extract", url, page_type=PageType.TEAM):
+        team = parse_team(soup, id)
+    index_team_names(team)
+
+    # Adding the team info to the cache before returning
+    # The page has the team's current info and roster, so they replace the cached ones, but the stats that list_top_teams
+    # may have merged into the cached team meanwhile are kept instead of being overwritten
+    def keep_cached_stats(cached_team: Team) -> Team:
+        if cached_team is not None:
+            team.time_specific_data = {**cached_team.time_specific_data, **team.time_specific_data}
+        return team
+    # The team's TTL counts from when the page was fetched, since that's how old the team's info is
+    team = global_cache.update(CacheType.TEAMS, id, keep_cached_stats, fetched_at)
+    if scraper.prefetcher:
+        scraper.prefetcher.add_related_to_team(team)
+
+    return team
+
+def get_team_by_name(scraper: HLTVScraper, name: str) -> Team:
+    """
+    Returns info for the team with the given name(case-insensitive), the same as get_team.
+    The ID is looked up in the name index(see NameIndex), and only teams the index hasn't seen yet need a scrape of
+    the all time team rankings to find their ID
+
+    Raises KeyError if no team goes by the name
+    """
+    team_id = global_name_index.get_id(IndexType.TEAMS, name)
+    if team_id is None:
+        list_top_teams(scraper) # Fills the name index with every ranked team
+        team_id = global_name_index.get_id(IndexType.TEAMS, name)
+        if team_id is None:
+            raise KeyError(f"No team named {name} was found")
+    return get_team(scraper, team_id, name)
+
+def index_team_names(team: Team):
+    # Adds the names and IDs on a team(the team itself, its players and coach) to the name index
+    global_name_index.add(IndexType.TEAMS, team.id, team.name)
+    for player_name, player_id in team.players.items():
+        global_name_index.add(IndexType.PLAYERS, player_id, player_name)
+    for coach_name, coach_id in team.coach.items():
+        global_name_index.add(IndexType.COACHES, coach_id, coach_name)
+
+def parse_team(page, id: int) -> Team:
+    """
+    Parses a team's profile page(/team/{id}/{name}) into a Team.
+    page is either the page's HTML or the BeautifulSoup parsed from it
+    """
+    soup = make_soup(page, PageType.TEAM)
 
     team_profile = soup.find("div", class_="teamProfile")
 
@@ -64,7 +139,7 @@ def get_team(scraper: HLTVScraper, id: int, team_name: str = None) -> Team:
     coach_name = coach_anchor.find("span").get_text(strip=True).strip("'")
     coach = {coach_name: coach_id}
 
-    team = Team(
+    return Team(
         id=id,
         name=name,
         region=region,
@@ -74,11 +149,6 @@ def get_team(scraper: HLTVScraper, id: int, team_name: str = None) -> Team:
         coach=coach
     )
 
-    # Adding the team info to the cache before returning
-    global_cache.set(CacheType.TEAMS, id, team)
-
-    return team
-
 
 def list_top_teams(
         scraper: HLTVScraper,
@@ -109,19 +179,87 @@ def list_top_teams(
     kd_ratio: The K-D ratio by the team in the specified timeframe
     rating: The HLTV 2.1 rating of the team in the specified timeframe
     """
+    query_key, url = _get_top_teams_query(scraper, start_date, end_date, match_type, maps, num_results)
+    buttons = [scraper.cookie_text]
+    soup = scraper.get_website(url, buttons, PageType.TEAM_RANKINGS)
+
+    with global_metrics.phase("extract", url, page_type=PageType.TEAM_RANKINGS):
+        parsed_teams = parse_top_teams(soup, str(query_key))
+    return [_cache_top_team(new_team) for new_team in parsed_teams]
+
+def iter_top_teams(
+        scraper: HLTVScraper,
+        start_date: datetime=None,
+        end_date: datetime=None,
+        match_type: MatchType = None,
+        maps: list[Maps] = None,
+        num_results: int = None,
+        limit: int = None
+    ) -> Iterator[Team]:
+    """
+    Generator version of list_top_teams, which yields each Team as soon as its row is extracted and cached instead of building the whole list.
+    The page is still fetched and parsed into one soup before the first Team is yielded, so this doesn't lower the fetch latency
+    or the memory the soup takes, only the work spent on rows that aren't used.
+    limit is the max number of teams to yield, None for all of them. Unlike num_results, it isn't restricted to HLTV's ranking filters
+    and stopping early(breaking out of the loop or reaching the limit) skips extracting and caching the rest of the rows
+    """
+    query_key, url = _get_top_teams_query(scraper, start_date, end_date, match_type, maps, num_results)
+    buttons = [scraper.cookie_text]
+    soup = scraper.get_website(url, buttons, PageType.TEAM_RANKINGS)
+
+    for new_team in itertools.islice(iter_parse_top_teams(soup, str(query_key)), limit):
+        yield _cache_top_team(new_team)
+
+def _get_top_teams_query(
+        scraper: HLTVScraper,
+        start_date: datetime,
+        end_date: datetime,
+        match_type: MatchType,
+        maps: list[Maps],
+        num_results: int
+    ) -> tuple[QueryKey, str]:
+    """
+    Validates the arguments of list_top_teams and returns the (query key, URL) of the rankings page they're for
+    """
     if (start_date and end_date) and (start_date > end_date - timedelta(weeks=1)):
         raise Exception(f"Input start date {start_date} must be at least one week before the end date {end_date}")
     possible_num_results = [5, 10, 20, 30, 50]
     if num_results and num_results not in possible_num_results:
         raise Exception(f"The number of top teams to get must be one of {possible_num_results}")
 
+    query_key = QueryKey.create(start_date, end_date, match_type, maps) # The filters we're scraping this data for
+
+    # When num_results is null, we give all results back to user, which is done by not specifying any arguments in the url
+    # It only changes how many teams are listed and not their stats, so it isn't part of the query key
+    ranking_filter = [("rankingFilter", f"Top{num_results}")] if num_results else []
     url = f"{scraper.default_url}/stats/teams"
-    url += URLUtil.get_end_of_url(start_date, end_date, match_type, maps)
-    if num_results: # When num_results is null, we give all results back to user, which is done by not specifying any arguments in the url
-        url += f"&rankingFilter=Top{num_results}"
+    url += URLUtil.get_end_of_url(query_key, ranking_filter)
+    return query_key, url
 
-    buttons = [scraper.cookie_text]
-    soup = scraper.get_website(url, buttons)
+def _cache_top_team(new_team: Team) -> Team:
+    """
+    Adds a team parsed from the rankings page into the cache, or merges it into the existing cache item if one exists,
+    and returns the cached team
+    """
+    index_team_names(new_team)
+
+    # Merged into a copy of the cached team, so threads reading the cached one never see it half merged
+    return global_cache.merge(CacheType.TEAMS, new_team.id, new_team)
+
+def parse_top_teams(page, query_key: str) -> list[Team]:
+    """
+    Parses the team rankings page(/stats/teams) into a list of Teams ordered by team rank, where each team's stats are
+    stored in its time_specific_data under query_key(the string of the page's QueryKey). The fields are described in list_top_teams
+    page is either the page's HTML or the BeautifulSoup parsed from it
+    """
+    return list(iter_parse_top_teams(page, query_key))
+
+def iter_parse_top_teams(page, query_key: str) -> Iterator[Team]:
+    """
+    Generator version of parse_top_teams, which yields the page's Teams in rank order as each row is extracted from the page's soup.
+    HTML is parsed into the whole soup first
+    """
+    soup = make_soup(page, PageType.TEAM_RANKINGS)
 
     # Finding the main table, header, and body
     table = soup.find("table", class_="stats-table player-ratings-table")
@@ -145,11 +283,9 @@ def list_top_teams(
             raise Exception(f"Retrieved headers {header} is not what's expected in {expected_header}, scraping might not work for this new format")
 
     # Each of the team info is stored in a row, ordered by team rank
-    interval_string = CacheManager.datetime_interval_to_string(start_date, end_date) # String representing the time interval we're scraping this data for
-    teams = [] # The result
-    rows = body.find_all("tr")
-    for idx in range(len(rows)):
-        row = rows[idx]
+    # The rows are walked one at a time instead of collecting all of them upfront, so stopping early skips the rest
+    rows = (child for child in body.children if child.name == "tr")
+    for idx, row in enumerate(rows):
         cells = row.find_all("td")
         # Example cells:
         # <td class="teamCol-teams-overview">
@@ -177,24 +313,17 @@ def list_top_teams(
             id=id,
             name=cells[0].find('a').get_text(strip=True),
             region=cells[0].find('img')['title'],
+            valve_rank=None, # The rankings page doesn't show the team's current ranks, get_team does
+            world_rank=None,
             time_specific_data={
-                interval_string: {
+                query_key: TeamStats({
                     "rank": idx + 1,
-                    "num_maps_played": cells[1].get_text(strip=True),
-                    "kd_diff": cells[2].get_text(strip=True),
-                    "kd_ratio": cells[3].get_text(strip=True),
-                    "rating": cells[3].get_text(strip=True)
-                }
+                    "num_maps_played": int(cells[1].get_text(strip=True)),
+                    "kd_diff": int(cells[2].get_text(strip=True)), # int() takes the sign, ex: "+424" or "-12"
+                    "kd_ratio": float(cells[3].get_text(strip=True)),
+                    "rating": float(cells[4].get_text(strip=True))
+                })
             }
         )
 
-        # Adds the item into the cache or merges it into the existing cache item if one exists
-        cached_team = global_cache.get(CacheType.TEAMS, id)
-        if cached_team is not None:
-            CacheManager.merge_dataclasses(cached_team, new_team)
-            teams.append(cached_team)
-        else:
-            global_cache.set(CacheType.TEAMS, id, new_team)
-            teams.append(new_team)
-
-    return teams
+        yield new_team
@@ -0,0 +1,8 @@
+from enum import Enum
+
+class MatchEventType(Enum):
+    ADDED = "added" # The match wasn't listed in the previous poll
+    REMOVED = "removed" # The match was listed in the previous poll and isn't anymore(ex: it finished or got cancelled)
+    RESCHEDULED = "rescheduled" # The match's time changed
+    WENT_LIVE = "went_live" # The match started
+    TEAMS_DECIDED = "teams_decided" # A team that was still undecided in the previous poll is now known
@@ -0,0 +1,8 @@
+from enum import Enum
+
+class PageType(Enum):
+    MATCHES = "matches" # /matches
+    PLAYER = "player" # /player/{id}/{name}
+    PLAYER_STATS = "player_stats" # /stats/players/{id}/{name}
+    TEAM = "team" # /team/{id}/{name}
+    TEAM_RANKINGS = "team_rankings" # /stats/teams
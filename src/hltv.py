@@ -1,13 +1,19 @@
+from classes.batch_result import BatchResult
 from classes.match import Match
 from classes.player import Player
 from classes.team import Team
+from endpoints.batch import *
 from endpoints.matches import *
 from endpoints.players import *
+from endpoints.prefetch import *
 from endpoints.teams import *
 from enums.maps import Maps
 from enums.match_types import MatchType
 from util.scraper import *
 from datetime import datetime
+from functools import partial
+from typing import AsyncIterator, Callable, Iterator
+import asyncio
 
 class HLTV:
     """
@@ -16,16 +22,114 @@ class HLTV:
     Outside of the input arguments to instantiate the class, the user should not know what happens inside this class
     """
     scraper: HLTVScraper
+    metrics_callback: Callable[[MetricEvent], None] # Registered with global_metrics until the connection is closed, None when not set
+    prefetcher: PrefetchScheduler # None when prefetching is off
     
-    def __init__(self, max_calls_per_second: int):
-        self.scraper = HLTVScraper(max_calls_per_second)
+    def __init__(
+            self,
+            max_calls_per_second: float,
+            use_http_fetcher: bool = True,
+            num_browsers: int = 1,
+            num_workers: int = None,
+            cache_db_path: str = None,
+            cache_ttls: dict[CacheType, float] = None,
+            html_store_dir: str = None,
+            html_store_max_age: float = None,
+            replay: bool = False,
+            fast_parsing: bool = False,
+            rate_limit_burst: float = None,
+            route_rate_limits: dict[str, tuple[float, float]] = None,
+            shared_rate_limit_path: str = None,
+            metrics_callback: Callable[[MetricEvent], None] = None,
+            debug_dump_path: str = None,
+            browser_profile_dir: str = None,
+            current_stats_ttl: float = None,
+            all_time_stats_ttl: float = None,
+            cache_memory_budget: int = None,
+            cache_memory_weights: dict[CacheType, float] = None,
+            prefetch_depth: int = None,
+            html_store_max_ages: dict[PageType, float] = None
+    ):
+        """
+        cache_db_path: Path of the SQLite DB to persist the cache in, so that restarts don't need to scrape again. None keeps the cache in memory only
+        cache_ttls: Number of seconds each type of cached data stays fresh after it was fetched, in memory and in the DB, see CacheManager.DEFAULT_PERSISTENT_TTLS
+        html_store_dir: Directory to store the raw HTML of every fetched page in, see HTMLStore. None doesn't store pages
+        html_store_max_age: Number of seconds a stored page of any type is served instead of fetching it again, None keeps HTMLStore.DEFAULT_MAX_AGES,
+            which are short for pages that change often(ex: 60 seconds for upcoming matches)
+        replay: Only serve pages from html_store_dir and never fetch, for re-running the parsers on stored pages
+        fast_parsing: Parse this client's pages with lxml and only build the parts of each page its endpoint needs, see util/parsing.py
+        rate_limit_burst: The max number of calls that can be made at once after being idle, defaults to max_calls_per_second
+        route_rate_limits: Map from URL path prefix(ex: "/stats") to (max calls per second, burst) for the pages under it, on top of the global limit
+        shared_rate_limit_path: Path of a state file that every worker process on the host passes in to share one rate limit, see SharedRateLimitedExecutor
+        metrics_callback: Called with every MetricEvent(phase timings, scrape traces and cache counters), see util/metrics.py
+        debug_dump_path: Path to write the prettified HTML of the last scraped page to, for debugging parsers. None doesn't write it
+        browser_profile_dir: Directory to keep the browser profiles and cookies in across runs, so that new processes reuse the
+            Cloudflare clearance and cookie consent of earlier ones. None starts with fresh browsers every time
+        current_stats_ttl: Number of seconds cached stats for an interval that ends today or later stay fresh, see CacheManager.is_interval_fresh.
+            Stats fetched after their interval ended are always served from the cache. None keeps CacheManager.DEFAULT_CURRENT_INTERVAL_TTL
+        all_time_stats_ttl: Number of seconds cached all time stats stay fresh, None keeps CacheManager.DEFAULT_ALL_TIME_TTL
+        cache_memory_budget: Number of bytes the in-memory cache can take, None keeps CacheManager.DEFAULT_MEMORY_BUDGET. See get_cache_stats for the actual footprint.
+            A single item can take at most its type's share of the budget divided by CacheManager.NUM_STRIPES, bigger ones are only cached in cache_db_path
+        cache_memory_weights: Share of the memory budget each type of cached data gets, None keeps CacheManager.DEFAULT_MEMORY_WEIGHTS
+        prefetch_depth: Prefetch the players, teams and stats related to fetched pages in the background with the rate limit budget
+            the calls leave over, up to this many links away from what was asked for(ex: 1 prefetches a fetched team's players and their stats).
+            See PrefetchScheduler. None doesn't prefetch
+        html_store_max_ages: Map from page type to the number of seconds its stored pages are served for, on top of html_store_max_age.
+            Pages are always fetched again when what was parsed from them went stale(ex: stats past current_stats_ttl), regardless of their max age
+        """
+        if cache_ttls:
+            global_cache.configure_ttls(cache_ttls)
+        if cache_db_path:
+            global_cache.enable_persistence(cache_db_path)
+            global_name_index.enable_persistence(cache_db_path)
+        global_cache.configure_freshness(current_stats_ttl, all_time_stats_ttl)
+        if cache_memory_budget or cache_memory_weights:
+            global_cache.configure_memory(cache_memory_budget or CacheManager.DEFAULT_MEMORY_BUDGET, cache_memory_weights)
+        html_store = HTMLStore(html_store_dir, html_store_max_age, html_store_max_ages) if html_store_dir else None
+        self.metrics_callback = metrics_callback
+        if metrics_callback:
+            global_metrics.add_callback(metrics_callback)
+        page_sinks = [PageDumpSink(debug_dump_path)] if debug_dump_path else []
+        self.scraper = HLTVScraper(
+            max_calls_per_second,
+            use_http_fetcher,
+            num_browsers,
+            num_workers,
+            html_store,
+            replay,
+            rate_limit_burst,
+            route_rate_limits,
+            shared_rate_limit_path,
+            page_sinks,
+            browser_profile_dir,
+            fast_parsing
+        )
+        self.prefetcher = None
+        if prefetch_depth is not None:
+            self.prefetcher = PrefetchScheduler(self.scraper, prefetch_depth)
+            self.prefetcher.start()
 
     def close_connection(self):
+        if self.prefetcher:
+            self.prefetcher.stop()
         self.scraper.end_scraping()
+        if self.metrics_callback:
+            global_metrics.remove_callback(self.metrics_callback)
+            self.metrics_callback = None
+
+    def get_cache_stats(self) -> dict[CacheType, CacheStats]:
+        # Returns the hits, misses, evictions and memory footprint of each type of cached data
+        return global_cache.get_stats()
 
     # Match APIs
     def get_upcoming_matches(self, skip_pending_team_matches: bool) -> list[Match]:
         return get_upcoming_matches(self.scraper, skip_pending_team_matches)
+
+    def iter_upcoming_matches(self, skip_pending_team_matches: bool = False, limit: int = None) -> Iterator[Match]:
+        return iter_upcoming_matches(self.scraper, skip_pending_team_matches, limit)
+
+    def watch_upcoming_matches(self, poll_interval: float = 60, max_polls: int = None) -> Iterator[MatchEvent]:
+        return watch_upcoming_matches(self.scraper, poll_interval, max_polls)
     
     # Player APIs
     def get_player(
@@ -34,6 +138,13 @@ class HLTV:
             player_name: str = None
     ) -> Player:
         return get_player(self.scraper, id, player_name)
+
+    def get_player_by_name(self, name: str) -> Player:
+        return get_player_by_name(self.scraper, name)
+
+    def search_players(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        # Returns (name, ID) of the players seen so far whose name starts with the prefix(case-insensitive), without scraping
+        return global_name_index.search(IndexType.PLAYERS, prefix, limit)
     
     def get_player_stats(
             self,
@@ -45,6 +156,19 @@ class HLTV:
             maps: list[Maps] = None
     ) -> Player:
         return get_player_stats(self.scraper, id, player_name, start_date, end_date, match_type, maps)
+
+    def get_players(self, ids: list[int]) -> list[BatchResult]:
+        return get_players(self.scraper, ids)
+
+    def get_player_stats_many(
+            self,
+            ids: list[int],
+            start_date: datetime=None,
+            end_date: datetime=None,
+            match_type: MatchType = None,
+            maps: list[Maps] = None
+    ) -> list[BatchResult]:
+        return get_player_stats_many(self.scraper, ids, start_date, end_date, match_type, maps)
     
     # Team APIs
     def get_team(
@@ -54,6 +178,16 @@ class HLTV:
     ) -> Team:
         return get_team(self.scraper, id, team_name)
 
+    def get_team_by_name(self, name: str) -> Team:
+        return get_team_by_name(self.scraper, name)
+
+    def search_teams(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        # Returns (name, ID) of the teams seen so far whose name starts with the prefix(case-insensitive), without scraping
+        return global_name_index.search(IndexType.TEAMS, prefix, limit)
+
+    def get_teams(self, ids: list[int]) -> list[BatchResult]:
+        return get_teams(self.scraper, ids)
+
     def list_top_teams(
         self,
         start_date: datetime=None,
@@ -70,3 +204,177 @@ class HLTV:
             maps,
             num_results
         )
+
+    def iter_top_teams(
+        self,
+        start_date: datetime=None,
+        end_date: datetime=None,
+        match_type: MatchType = None,
+        maps: list[Maps] = None,
+        num_results: int = None,
+        limit: int = None
+    ) -> Iterator[Team]:
+        return iter_top_teams(self.scraper, start_date, end_date, match_type, maps, num_results, limit)
+
+class AsyncHLTV:
+    """
+    asyncio counterpart of HLTV, where every API is a coroutine
+
+    Each call runs the same endpoint as HLTV on the scraper's thread pool, so page fetches, parses and waits on the rate limit
+    never block the event loop. Several calls can be in flight at once, up to num_workers(HLTVScraper.DEFAULT_NUM_WORKERS unless set).
+    A call waiting on the rate limit holds its worker thread while it waits, and calls that fall back to the browser still
+    load pages one at a time per browser(see num_browsers)
+    """
+    hltv: HLTV # The sync client whose scraper the calls run on
+    scraper: HLTVScraper
+
+    def __init__(
+            self,
+            max_calls_per_second: float,
+            use_http_fetcher: bool = True,
+            num_browsers: int = 1,
+            num_workers: int = None,
+            cache_db_path: str = None,
+            cache_ttls: dict[CacheType, float] = None,
+            html_store_dir: str = None,
+            html_store_max_age: float = None,
+            replay: bool = False,
+            fast_parsing: bool = False,
+            rate_limit_burst: float = None,
+            route_rate_limits: dict[str, tuple[float, float]] = None,
+            shared_rate_limit_path: str = None,
+            metrics_callback: Callable[[MetricEvent], None] = None,
+            debug_dump_path: str = None,
+            browser_profile_dir: str = None,
+            current_stats_ttl: float = None,
+            all_time_stats_ttl: float = None,
+            cache_memory_budget: int = None,
+            cache_memory_weights: dict[CacheType, float] = None,
+            prefetch_depth: int = None,
+            html_store_max_ages: dict[PageType, float] = None
+    ):
+        """
+        Takes the same arguments as HLTV, see HLTV.__init__ for what each one does
+        """
+        self.hltv = HLTV(
+            max_calls_per_second=max_calls_per_second,
+            use_http_fetcher=use_http_fetcher,
+            num_browsers=num_browsers,
+            num_workers=num_workers,
+            cache_db_path=cache_db_path,
+            cache_ttls=cache_ttls,
+            html_store_dir=html_store_dir,
+            html_store_max_age=html_store_max_age,
+            replay=replay,
+            fast_parsing=fast_parsing,
+            rate_limit_burst=rate_limit_burst,
+            route_rate_limits=route_rate_limits,
+            shared_rate_limit_path=shared_rate_limit_path,
+            metrics_callback=metrics_callback,
+            debug_dump_path=debug_dump_path,
+            browser_profile_dir=browser_profile_dir,
+            current_stats_ttl=current_stats_ttl,
+            all_time_stats_ttl=all_time_stats_ttl,
+            cache_memory_budget=cache_memory_budget,
+            cache_memory_weights=cache_memory_weights,
+            prefetch_depth=prefetch_depth,
+            html_store_max_ages=html_store_max_ages
+        )
+        self.scraper = self.hltv.scraper
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_connection()
+
+    async def close_connection(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.hltv.close_connection)
+
+    async def _run(self, endpoint, *args):
+        # Runs the endpoint on the scraper's thread pool and awaits its result
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.scraper.executor, partial(endpoint, self.scraper, *args))
+
+    async def _iterate(self, endpoint, *args) -> AsyncIterator:
+        # Runs the generator endpoint on the scraper's thread pool, one item at a time, and yields its items
+        loop = asyncio.get_running_loop()
+        generator = endpoint(self.scraper, *args)
+        end = object() # Returned by next once the generator is done, since StopIteration can't be raised through a future
+        try:
+            while (item := await loop.run_in_executor(self.scraper.executor, next, generator, end)) is not end:
+                yield item
+        finally:
+            generator.close()
+
+    # Match APIs
+    async def get_upcoming_matches(self, skip_pending_team_matches: bool) -> list[Match]:
+        return await self._run(get_upcoming_matches, skip_pending_team_matches)
+
+    def iter_upcoming_matches(self, skip_pending_team_matches: bool = False, limit: int = None) -> AsyncIterator[Match]:
+        return self._iterate(iter_upcoming_matches, skip_pending_team_matches, limit)
+
+    async def watch_upcoming_matches(self, poll_interval: float = 60, max_polls: int = None) -> AsyncIterator[MatchEvent]:
+        # Same as HLTV.watch_upcoming_matches, where the wait between polls is done on the event loop instead of holding a worker thread
+        watcher = MatchWatcher()
+        poll = 0
+        while max_polls is None or poll < max_polls:
+            if poll:
+                await asyncio.sleep(poll_interval)
+            for event in await self._run(lambda scraper: watcher.update(get_matches_page(scraper, refresh=True))):
+                yield event
+            poll += 1
+
+    # Player APIs
+    async def get_player(
+            self,
+            id: int,
+            player_name: str = None
+    ) -> Player:
+        return await self._run(get_player, id, player_name)
+
+    async def get_player_by_name(self, name: str) -> Player:
+        return await self._run(get_player_by_name, name)
+
+    async def get_player_stats(
+            self,
+            id: int,
+            player_name: str = None,
+            start_date: datetime=None,
+            end_date: datetime=None,
+            match_type: MatchType = None,
+            maps: list[Maps] = None
+    ) -> Player:
+        return await self._run(get_player_stats, id, player_name, start_date, end_date, match_type, maps)
+
+    # Team APIs
+    async def get_team(
+        self,
+        id: int,
+        team_name: str = None
+    ) -> Team:
+        return await self._run(get_team, id, team_name)
+
+    async def get_team_by_name(self, name: str) -> Team:
+        return await self._run(get_team_by_name, name)
+
+    async def list_top_teams(
+        self,
+        start_date: datetime=None,
+        end_date: datetime=None,
+        match_type: MatchType = None,
+        maps: list[Maps] = None,
+        num_results: int = None
+    ) -> list[Team]:
+        return await self._run(list_top_teams, start_date, end_date, match_type, maps, num_results)
+
+    def iter_top_teams(
+        self,
+        start_date: datetime=None,
+        end_date: datetime=None,
+        match_type: MatchType = None,
+        maps: list[Maps] = None,
+        num_results: int = None,
+        limit: int = None
+    ) -> AsyncIterator[Team]:
+        return self._iterate(iter_top_teams, start_date, end_date, match_type, maps, num_results, limit)
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+
+class CookieJar:
+    """
+    On-disk jar of the cookies and user agent of the browser sessions that got through HLTV, so that the next run starts with them.
+    This holds the Cloudflare clearance(cf_clearance, which is tied to the user agent) and the cookie consent state,
+    so a new process doesn't have to pass the challenge or click the cookie banner again until they expire
+
+    Cookies are stored as a JSON list in the format selenium uses(name, value, domain, path, expiry, ...)
+    """
+    path: str
+    cookies: dict[tuple, dict] # Map from (name, domain, path) to the cookie
+    user_agent: str # The user agent the cookies were issued to, None if no browser session was saved yet
+    lock: threading.Lock
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cookies = {}
+        self.user_agent = None
+        self.lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _get_key(cookie: dict) -> tuple:
+        return (cookie["name"], cookie.get("domain"), cookie.get("path", "/"))
+
+    @staticmethod
+    def _is_expired(cookie: dict, now: float) -> bool:
+        # Session cookies have no expiry, and are kept until they get replaced
+        return "expiry" in cookie and cookie["expiry"] < now
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except ValueError as e:
+            # A corrupted jar just means starting over with a fresh session
+            print(f"Ignoring the cookie jar at {self.path} since it couldn't be read due to error {e}")
+            return
+
+        now = time.time()
+        with self.lock:
+            self.user_agent = saved.get("user_agent")
+            self.cookies = {
+                CookieJar._get_key(cookie): cookie for cookie in saved.get("cookies", []) if not CookieJar._is_expired(cookie, now)
+            }
+
+    def get_cookies(self) -> list[dict]:
+        now = time.time()
+        with self.lock:
+            return [cookie for cookie in self.cookies.values() if not CookieJar._is_expired(cookie, now)]
+
+    def has_cookie(self, name: str) -> bool:
+        return any(cookie["name"] == name for cookie in self.get_cookies())
+
+    def update(self, cookies: list[dict], user_agent: str = None):
+        """
+        Adds the cookies to the jar(replacing the ones with the same name, domain and path) and writes the jar to disk
+        """
+        with self.lock:
+            for cookie in cookies:
+                self.cookies[CookieJar._get_key(cookie)] = cookie
+            if user_agent:
+                self.user_agent = user_agent
+            saved = {"user_agent": self.user_agent, "cookies": list(self.cookies.values())}
+
+            # Writing to a temporary file first so that a crash never leaves a partially written jar
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(saved, f)
+            os.replace(temp_path, self.path)
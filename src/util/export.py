@@ -0,0 +1,208 @@
+from array import array
+from classes.player import Player
+from classes.stat_record import PlayerStats, StatRecord, TeamStats
+from classes.team import Team
+from enums.maps import Maps
+from enums.match_types import MatchType
+from typing import Callable, TYPE_CHECKING
+from util.query_key import QueryKey
+import math
+
+# Export of scraped players and teams into typed columnar tables, for analysis with pandas or batch pipelines reading Parquet
+#
+# Each table has one row per entity per query in its time_specific_data(one row with empty query and stats for entities without any),
+# with the entity's fields, the query's filters and one numeric column per stat. Match types and maps are dictionary encoded
+# with every value of their enum, so the codes are the same in every exported file
+#
+# pyarrow(and pandas for to_dataframe) are optional dependencies, only imported when exporting
+if TYPE_CHECKING:
+    import pandas
+    import pyarrow
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise ImportError("Exporting needs pyarrow, install it with pip install pyarrow")
+
+# Map from column name to (pyarrow type name, getter of the column's value from the entity)
+# Type names are looked up on pyarrow when exporting, so that it's only imported then
+player_columns: dict[str, tuple[str, Callable[[Player], object]]] = {
+    "id": ("int64", lambda player: player.id),
+    "name": ("string", lambda player: player.name),
+    "real_name": ("string", lambda player: player.real_name),
+    "nationality": ("string", lambda player: player.nationality),
+    "age": ("int64", lambda player: player.age),
+    "team_id": ("int64", lambda player: player.team_id),
+    "team_name": ("string", lambda player: player.team_name),
+    "time_with_team": ("int64", lambda player: player.time_with_team),
+    "time_with_any_team": ("int64", lambda player: player.time_with_any_team),
+}
+
+team_columns: dict[str, tuple[str, Callable[[Team], object]]] = {
+    "id": ("int64", lambda team: team.id),
+    "name": ("string", lambda team: team.name),
+    "region": ("string", lambda team: team.region),
+    "valve_rank": ("int64", lambda team: team.valve_rank),
+    "world_rank": ("int64", lambda team: team.world_rank),
+}
+
+def _get_rows(entities: list) -> tuple[list, list[str], list[StatRecord]]:
+    """
+    Returns the entity, query key string and stats of every row, where entities without time specific data get a row with None for both
+    """
+    row_entities = []
+    row_keys = []
+    row_records = []
+    for entity in entities:
+        if not entity.time_specific_data:
+            row_entities.append(entity)
+            row_keys.append(None)
+            row_records.append(None)
+            continue
+        for key_string, record in entity.time_specific_data.items():
+            row_entities.append(entity)
+            row_keys.append(key_string)
+            row_records.append(record)
+    return row_entities, row_keys, row_records
+
+def _get_enum_column(pyarrow, codes: list[int], enum_type) -> "pyarrow.Array":
+    # Dictionary encoded column whose dictionary is every value of the enum, so the code of a value never depends on the data
+    return pyarrow.DictionaryArray.from_arrays(
+        pyarrow.array(codes, type=pyarrow.int8()),
+        pyarrow.array([member.value for member in enum_type], type=pyarrow.string())
+    )
+
+def _get_query_columns(pyarrow, row_keys: list[str]) -> dict[str, "pyarrow.Array"]:
+    """
+    Returns the query_key, start_date, end_date, match_type and maps columns, where each distinct key is only parsed once
+    """
+    # Every row's index into the distinct keys, which is how the per-key columns get expanded to the rows with a single take
+    distinct_keys = {}
+    row_indexes = [distinct_keys.setdefault(key_string, len(distinct_keys)) for key_string in row_keys]
+    query_keys = [QueryKey.from_string(key_string) if key_string is not None else None for key_string in distinct_keys]
+    indexes = pyarrow.array(row_indexes, type=pyarrow.int32())
+
+    match_types = list(MatchType)
+    maps = list(Maps)
+    map_codes = []
+    map_offsets = [0]
+    for query_key in query_keys:
+        if query_key is not None:
+            map_codes.extend(maps.index(map) for map in query_key.get_sorted_maps())
+        map_offsets.append(len(map_codes))
+
+    key_columns = {
+        "query_key": pyarrow.array(list(distinct_keys), type=pyarrow.string()).dictionary_encode(),
+        "start_date": pyarrow.array([query_key.start_date if query_key else None for query_key in query_keys], type=pyarrow.date32()),
+        "end_date": pyarrow.array([query_key.end_date if query_key else None for query_key in query_keys], type=pyarrow.date32()),
+        "match_type": _get_enum_column(
+            pyarrow,
+            [match_types.index(query_key.match_type) if query_key and query_key.match_type else None for query_key in query_keys],
+            MatchType
+        ),
+        "maps": pyarrow.ListArray.from_arrays(
+            pyarrow.array(map_offsets, type=pyarrow.int32()),
+            _get_enum_column(pyarrow, map_codes, Maps)
+        ),
+    }
+    return {name: column.take(indexes) for name, column in key_columns.items()}
+
+def _get_stat_columns(pyarrow, row_records: list[StatRecord], record_type: type) -> dict[str, "pyarrow.Array"]:
+    """
+    Returns a column per stat of the record type. The records' arrays are concatenated into one buffer that every column is a
+    strided view of, so no stat is boxed into a Python object on the way. Missing stats(NaN) become nulls
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Exporting needs numpy, install it with pip install numpy")
+
+    num_stats = len(record_type.stat_types)
+    empty_values = array("d", [math.nan]) * num_stats
+    values = array("d")
+    for record in row_records:
+        if record is None:
+            values.extend(empty_values)
+        elif isinstance(record, StatRecord):
+            values.extend(record.values)
+        else:
+            values.extend(record_type(record).values) # Plain dicts of stats, ex: built by hand
+    matrix = numpy.frombuffer(values, dtype=numpy.float64).reshape(len(row_records), num_stats)
+
+    columns = {}
+    for idx, (name, stat_type) in enumerate(record_type.stat_types.items()):
+        column = matrix[:, idx]
+        missing = numpy.isnan(column)
+        if stat_type is int:
+            columns[name] = pyarrow.array(numpy.where(missing, 0, column).astype(numpy.int64), mask=missing, type=pyarrow.int64())
+        else:
+            columns[name] = pyarrow.array(column, mask=missing, type=pyarrow.float64())
+    return columns
+
+def _to_table(entities: list, entity_columns: dict, record_type: type, extra_columns: dict = None) -> "pyarrow.Table":
+    pyarrow = _import_pyarrow()
+    row_entities, row_keys, row_records = _get_rows(entities)
+
+    columns = {
+        name: pyarrow.array([get_value(entity) for entity in row_entities], type=getattr(pyarrow, type_name)())
+        for name, (type_name, get_value) in entity_columns.items()
+    }
+    columns.update(_get_query_columns(pyarrow, row_keys))
+    for name, get_values in (extra_columns or {}).items():
+        columns[name] = get_values(pyarrow, row_entities, row_keys)
+    columns.update(_get_stat_columns(pyarrow, row_records, record_type))
+    return pyarrow.table(columns)
+
+def _get_fetched_at_column(pyarrow, row_entities: list[Player], row_keys: list[str]) -> "pyarrow.Array":
+    # fetched_at values are epoch seconds, stored as milliseconds since timestamps are integers
+    fetched_at = [player.time_specific_fetched_at.get(key_string) if key_string else None for player, key_string in zip(row_entities, row_keys)]
+    return pyarrow.array(
+        [round(value * 1000) if value is not None else None for value in fetched_at],
+        type=pyarrow.timestamp("ms", tz="UTC")
+    )
+
+def players_to_table(players: list[Player]) -> "pyarrow.Table":
+    """
+    Returns the pyarrow Table of the players, with one row per player per query in their time_specific_data.
+    Columns are the player's fields, the query's filters(query_key, start_date, end_date, match_type, maps), the time the stats
+    were fetched at(fetched_at) and every stat of PlayerStats
+    """
+    return _to_table(players, player_columns, PlayerStats, {"fetched_at": _get_fetched_at_column})
+
+def teams_to_table(teams: list[Team]) -> "pyarrow.Table":
+    """
+    Returns the pyarrow Table of the teams, with one row per team per query in their time_specific_data.
+    Columns are the team's fields, the query's filters(query_key, start_date, end_date, match_type, maps) and every stat of TeamStats.
+    Rosters aren't exported, since they aren't time specific
+    """
+    return _to_table(teams, team_columns, TeamStats)
+
+def to_table(entities: list) -> "pyarrow.Table":
+    """
+    Returns the pyarrow Table of a list of Players or a list of Teams, see players_to_table and teams_to_table
+    """
+    if entities and isinstance(entities[0], Team):
+        return teams_to_table(entities)
+    return players_to_table(entities)
+
+def to_dataframe(entities: list) -> "pandas.DataFrame":
+    """
+    Returns the pandas DataFrame of a list of Players or a list of Teams, where integer stats with missing values use pandas' nullable Int64
+    """
+    try:
+        import pandas
+    except ImportError:
+        raise ImportError("Exporting to a DataFrame needs pandas, install it with pip install pandas")
+    return to_table(entities).to_pandas(types_mapper={_import_pyarrow().int64(): pandas.Int64Dtype()}.get)
+
+def write_parquet(entities: list, path: str, **kwargs):
+    """
+    Writes a list of Players or a list of Teams to a Parquet file, see to_table for the columns.
+    kwargs are passed to pyarrow.parquet.write_table(ex: compression="zstd")
+    """
+    _import_pyarrow()
+    import pyarrow.parquet
+
+    pyarrow.parquet.write_table(to_table(entities), path, **kwargs)
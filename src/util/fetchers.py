@@ -0,0 +1,367 @@
+from contextlib import contextmanager
+from enums.page_types import PageType
+from typing import TYPE_CHECKING
+from util.cookie_jar import CookieJar
+from util.metrics import global_metrics
+from util.page_readiness import *
+import os
+import queue
+import threading
+
+# requests, selenium and undetected_chromedriver take a few hundred ms to import, so they are only imported once a fetcher
+# first needs them. A process that only serves cached data never imports them
+if TYPE_CHECKING:
+    import requests
+    import undetected_chromedriver as uc
+
+# Fetchers are the different ways we can get the raw HTML of an HLTV page
+# The scraper decides which fetcher to use for a page, the fetchers themselves only know how to get the HTML
+
+# Markers that show up in the page Cloudflare serves instead of the requested page when it wants the client to solve a challenge
+cloudflare_challenge_markers = [
+    "cf-browser-verification",
+    "cf-challenge-running",
+    "challenge-platform",
+    "_cf_chl_opt",
+    "<title>Just a moment...</title>",
+]
+
+class CloudflareChallengeError(Exception):
+    """
+    Raised by a fetcher when Cloudflare served a challenge page instead of the requested page
+    """
+    pass
+
+class HTTPFetchError(Exception):
+    """
+    Raised by the HTTP fetcher when the request failed(connection errors, timeouts, error statuses)
+    """
+    pass
+
+def is_cloudflare_challenge(status_code: int, headers: dict, html: str) -> bool:
+    """
+    Returns whether the response is a Cloudflare challenge rather than the page we asked for
+    """
+    if headers.get("cf-mitigated") == "challenge":
+        return True
+    # Challenges are served with 403 or 503, a normal 200 page can mention "challenge-platform" in its scripts
+    if status_code in (403, 503):
+        return any(marker in html for marker in cloudflare_challenge_markers)
+    return False
+
+class Fetcher:
+    """
+    Base class for fetchers. Each fetcher returns the raw HTML for the input URL
+    """
+    def fetch(self, url: str, buttons_to_click: list = [], page_type: PageType = None) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class HTTPFetcher(Fetcher):
+    """
+    Fetches pages through a pooled keep-alive HTTP session.
+    This skips the browser entirely, so it costs a round trip instead of a full page navigation.
+
+    Cloudflare will usually challenge this fetcher until it has been given the cookies(cf_clearance) and
+    user agent of a browser session that passed the challenge, see load_browser_session
+
+    The session is only created on first use
+    """
+    session: "requests.Session" # None until the session is first needed, see _get_session
+    pool_size: int
+    timeout: float
+    session_lock: threading.Lock
+
+    default_headers: dict = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    }
+
+    def __init__(self, pool_size: int = 10, timeout: float = 15):
+        self.pool_size = pool_size
+        self.timeout = timeout # In seconds
+        self.session = None
+        self.session_lock = threading.Lock()
+
+    def _get_session(self) -> "requests.Session":
+        with self.session_lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                # The adapter keeps up to pool_size connections to HLTV open so that each fetch reuses an existing TLS connection
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(self.default_headers)
+                self.session = session
+            return self.session
+
+    def load_browser_session(self, cookies: list[dict], user_agent: str = None):
+        """
+        Copies the cookies and user agent of a browser session into the HTTP session.
+        Cloudflare ties its clearance cookie to the user agent, so both need to match the browser's
+        """
+        session = self._get_session()
+        for cookie in cookies:
+            session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain"),
+                path=cookie.get("path", "/"),
+                expires=int(cookie["expiry"]) if "expiry" in cookie else None
+            )
+        if user_agent:
+            session.headers["User-Agent"] = user_agent
+
+    def get_cookies(self) -> list[dict]:
+        # The session's cookies in the same format as the browser's, since Cloudflare can refresh them on any response
+        if self.session is None:
+            return []
+        cookies = []
+        for cookie in self.session.cookies:
+            cookie_dict = {"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path}
+            if cookie.expires:
+                cookie_dict["expiry"] = cookie.expires
+            cookies.append(cookie_dict)
+        return cookies
+
+    def get_user_agent(self) -> str:
+        if self.session is None:
+            return self.default_headers["User-Agent"]
+        return self.session.headers["User-Agent"]
+
+    def fetch(self, url: str, buttons_to_click: list = [], page_type: PageType = None) -> str:
+        # Buttons and page type are ignored, they only change what the browser renders and not the HTML that the server sends
+        # The scraper checks the readiness of the returned page instead
+        import requests
+
+        session = self._get_session()
+        try:
+            with global_metrics.phase("navigation", url, fetcher="http"):
+                response = session.get(url, timeout=self.timeout)
+            if is_cloudflare_challenge(response.status_code, response.headers, response.text):
+                raise CloudflareChallengeError(f"Cloudflare challenged the HTTP fetch of {url}")
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise HTTPFetchError(f"HTTP fetch of {url} failed due to error {e}") from e
+        return response.text
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+class BrowserFetcher(Fetcher):
+    """
+    Fetches pages by navigating an undetected Chrome browser to them.
+    This is slow, but it's the only fetcher that can get through Cloudflare's challenge and click buttons on the page
+
+    With a profile directory, the browser keeps its profile(cookies, local storage, cache) there across runs instead of starting fresh
+    """
+    driver: "uc.Chrome"
+    page_load_timeout: float = 30 # Max seconds to wait for the page to be ready
+    button_timeout: float = 10 # Max seconds to wait for a button that is on the page to become clickable
+
+    def __init__(self, profile_dir: str = None):
+        from selenium.webdriver.chrome.options import Options
+        import undetected_chromedriver as uc
+
+        # Browser options
+        options = Options()
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-crash-reporter")
+        options.add_argument("--disable-popup-blocking")
+        options.add_argument("--disable-blink-features=AutomationControlled")  # Reduces automation detection
+        options.add_argument("--disable-dev-shm-usage")  # Fixes crash issues in Docker/Linux environments
+
+        # options.add_argument("--headless") # Runs the Chrome browser without popping up. Currently doesn't work since Cloudflare will block it
+        # options.add_argument(
+        #     "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+        # )
+
+        # Browser
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+        self.driver = uc.Chrome(options=options, user_data_dir=profile_dir)
+        self.driver.maximize_window()
+
+    def fetch(self, url: str, buttons_to_click: list = [], page_type: PageType = None) -> str:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        # Getting the site
+        with global_metrics.phase("navigation", url, fetcher="browser"):
+            self.driver.get(url)
+
+        # Waits until the elements needed for this page type are on the page
+        # Pages without a registered page type fall back to waiting for the initial page to fully load
+        ready_selectors = get_ready_selectors(page_type)
+        with global_metrics.phase("ready_wait", url, page_type=page_type):
+            if ready_selectors:
+                WebDriverWait(self.driver, self.page_load_timeout).until(
+                    lambda d: all(d.find_elements(By.CSS_SELECTOR, selector) for selector in ready_selectors)
+                )
+            else:
+                WebDriverWait(self.driver, self.page_load_timeout).until(
+                    lambda d: d.execute_script("return document.readyState") == "complete"
+                )
+
+        for button_text in buttons_to_click:
+            with global_metrics.phase("button_click", url, button=button_text):
+                self._click_button(button_text)
+
+        with global_metrics.phase("page_source", url):
+            return self.driver.page_source
+
+    def _click_button(self, button_text: str):
+        """
+        Clicks the button with the input visible text if it is on the page.
+        The page is already ready by the time this is called, so a button that isn't in the DOM(ex: the cookie banner
+        after cookies were accepted) isn't coming, and we skip it instead of waiting for it
+        """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        locator = (By.XPATH, f'//button[contains(text(), "{button_text}")]')
+        if not self.driver.find_elements(*locator):
+            return
+
+        try:
+            # Wait for and click the button by visible text
+            button = WebDriverWait(self.driver, self.button_timeout).until(EC.element_to_be_clickable(locator))
+            button.click()
+
+            # Wait for the DOM to update after click, which is when the button goes away
+            WebDriverWait(self.driver, self.button_timeout).until(EC.invisibility_of_element(button))
+        except Exception as e:
+            # If button click fails, just print a message saying so
+            # print(f"Failed to click button {button_text} due to error {e}")
+            print(f"Failed to click button \"{button_text}\"")
+
+    def get_cookies(self) -> list[dict]:
+        return self.driver.get_cookies()
+
+    def load_cookies(self, cookies: list[dict]):
+        """
+        Adds the cookies(in selenium's format) to the browser.
+        Selenium can only add cookies for the domain the browser is on, so they are set through the DevTools protocol instead,
+        which lets them be loaded before the first navigation
+        """
+        for cookie in cookies:
+            cookie_params = {
+                "name": cookie["name"],
+                "value": cookie["value"],
+                "domain": cookie.get("domain"),
+                "path": cookie.get("path", "/"),
+                "secure": cookie.get("secure", False),
+                "httpOnly": cookie.get("httpOnly", False),
+            }
+            if "expiry" in cookie:
+                cookie_params["expires"] = cookie["expiry"]
+            if "sameSite" in cookie:
+                cookie_params["sameSite"] = cookie["sameSite"]
+            self.driver.execute_cdp_cmd("Network.setCookie", cookie_params)
+
+    def get_user_agent(self) -> str:
+        return self.driver.execute_script("return navigator.userAgent")
+
+    def close(self):
+        # Quitting the driver once everything finishes
+        self.driver.quit()
+
+class BrowserPool(Fetcher):
+    """
+    Pool of browsers so that several pages can load at the same time instead of being serialized behind one tab.
+    Each fetch checks out a browser for the duration of the fetch, so at most pool_size pages are loading at once
+    and a fetch waits for a browser to free up once all of them are busy
+
+    Browsers are only launched when a fetch needs one and none of the launched ones are free, so a process that never
+    fetches through the browser never starts Chrome
+
+    Chrome can't run two browsers on the same profile, so with a profile directory each browser gets its own profile under it
+    """
+    pool_size: int
+    profile_dir: str
+    cookie_jar: CookieJar # Cookies to load into each browser when it is launched, None to launch them without any
+    browsers: list[BrowserFetcher] # The browsers launched so far
+    num_launching: int # Number of browsers launched or being launched, which never goes over pool_size
+    available_browsers: queue.Queue
+    lock: threading.Lock
+
+    def __init__(self, pool_size: int = 1, profile_dir: str = None, cookie_jar: CookieJar = None):
+        """
+        profile_dir: Directory to keep the browsers' profiles in across runs, None starts every browser with a fresh profile
+        cookie_jar: Jar whose cookies are loaded into every browser when it's launched, ex: the Cloudflare clearance of an earlier run
+        """
+        if pool_size < 1:
+            raise ValueError(f"Browser pool size must be at least 1, got {pool_size}")
+        self.pool_size = pool_size
+        self.profile_dir = profile_dir
+        self.cookie_jar = cookie_jar
+        self.browsers = []
+        self.num_launching = 0
+        self.available_browsers = queue.Queue()
+        self.lock = threading.Lock()
+
+    def _launch_browser(self, index: int) -> BrowserFetcher:
+        with global_metrics.phase("browser_launch"):
+            browser = BrowserFetcher(os.path.join(self.profile_dir, f"browser_{index}") if self.profile_dir else None)
+        cookies = self.cookie_jar.get_cookies() if self.cookie_jar else []
+        if cookies:
+            browser.load_cookies(cookies)
+        return browser
+
+    def _get_browser(self) -> BrowserFetcher:
+        # Reusing a free browser when there is one, then launching a new one while the pool isn't full, and otherwise waiting
+        try:
+            return self.available_browsers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            index = self.num_launching if self.num_launching < self.pool_size else None
+            if index is not None:
+                self.num_launching += 1
+        if index is None:
+            return self.available_browsers.get()
+
+        # Launching outside of the lock, since it takes seconds and other threads may be able to reuse a browser meanwhile
+        try:
+            browser = self._launch_browser(index)
+        except Exception:
+            with self.lock:
+                self.num_launching -= 1
+            raise
+        with self.lock:
+            self.browsers.append(browser)
+        return browser
+
+    @contextmanager
+    def checkout(self):
+        """
+        Context manager that hands out a browser nobody else is using and returns it to the pool afterwards
+        """
+        browser = self._get_browser()
+        try:
+            yield browser
+        finally:
+            self.available_browsers.put(browser)
+
+    def fetch(self, url: str, buttons_to_click: list = [], page_type: PageType = None) -> str:
+        with self.checkout() as browser:
+            return browser.fetch(url, buttons_to_click, page_type)
+
+    def close(self):
+        with self.lock:
+            browsers = list(self.browsers)
+        for browser in browsers:
+            browser.close()
@@ -1,28 +1,140 @@
-from cachetools import LRUCache
-from dataclasses import is_dataclass, fields
-from datetime import datetime
+from cachetools import Cache, LRUCache
+from classes.stat_record import StatRecord
+from dataclasses import dataclass, is_dataclass, fields
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Dict
+from typing import Any, Callable, Dict
+from util.metrics import global_metrics
+from util.persistent_cache import SQLiteCacheStore
+from util.query_key import QueryKey
+import copy
+import sys
+import threading
+import time
 
 class CacheType(Enum):
     PLAYERS = "players" # Maps from player ID to the player info
     TEAMS = "teams" # Maps from team ID to the team info
     MATCHES = "matches" # Maps from match ID to the match info
 
+def estimate_size(value: Any) -> int:
+    """
+    Returns an estimate of the number of bytes a cached item takes, following its dataclass fields, dicts, lists and stat records.
+    Objects shared between items(ex: interned query key strings) are counted in each of them, so this errs on the high side
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, StatRecord):
+        return size + sys.getsizeof(value.values)
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(item) for item in value)
+    if is_dataclass(value):
+        return size + sum(estimate_size(getattr(value, f.name)) for f in fields(value))
+    return size
+
+# An item in memory along with when its data was fetched, which its cache type's TTL counts from
+# Slotted so that each entry only adds a small fixed size on top of its item
+@dataclass(slots=True)
+class CacheEntry:
+    data: Any
+    fetched_at: float # Timestamp the item's data was fetched at, kept when the item is updated(see CacheManager.update)
+
+class SizedLRUCache(LRUCache):
+    """
+    LRUCache whose maxsize is a number of bytes, where each item's size is estimated with estimate_size.
+    Least recently used items are evicted until a new item fits, and each eviction is counted.
+
+    Each one is a stripe of a type's cache in CacheManager, and carries the locks and counters for the items in it.
+    Its values are CacheEntry objects
+    """
+    cache_type: "CacheType"
+    lock: threading.Lock # Held for every read and write of the LRU(even gets reorder it), only for as long as the read or write
+    update_lock: threading.Lock # Held by writers for the whole read-copy-write of an update(and by gets loading an item from the DB), so updates of the stripe never lose each other
+    memory_hits: int
+    persistent_hits: int
+    misses: int
+    evictions: int # Number of items evicted to make room for others
+
+    def __init__(self, cache_type: "CacheType", max_bytes: int):
+        super().__init__(maxsize=max_bytes, getsizeof=estimate_size)
+        self.cache_type = cache_type
+        self.lock = threading.Lock()
+        self.update_lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.evictions += 1
+        global_metrics.increment("cache.eviction", cache_type=self.cache_type)
+        return key, value
+
+@dataclass
+class CacheStats:
+    memory_hits: int # Number of gets served from memory
+    persistent_hits: int # Number of gets served from the persistent tier
+    misses: int # Number of gets that found nothing
+    evictions: int # Number of items evicted from memory to stay under the budget
+    num_items: int # Number of items currently in memory
+    size_bytes: int # Estimated number of bytes the items in memory take, see estimate_size
+    max_size_bytes: int # The type's memory budget
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return (self.memory_hits + self.persistent_hits) / lookups if lookups else 0.0
+
 class CacheManager:
-    DATE_FORMAT = "%Y-%m-%d"
-    ALL_TIME_INTERVAL = "ALL_TIME"
+    DATE_FORMAT = QueryKey.DATE_FORMAT
+    ALL_TIME_INTERVAL = QueryKey.ALL_TIME_INTERVAL
+
+    # Default number of seconds that each type of data stays fresh after it was fetched, in memory and in the persistent cache
+    # Player bios rarely change, while teams carry their rankings and matches get rescheduled, so those go stale much faster
+    DEFAULT_PERSISTENT_TTLS = {
+        CacheType.PLAYERS: 7 * 24 * 60 * 60,
+        CacheType.TEAMS: 12 * 60 * 60,
+        CacheType.MATCHES: 5 * 60,
+    }
+
+    # Default number of seconds that time specific data(ex: a player's stats over an interval) stays fresh, see is_interval_fresh
+    # Stats fetched after their interval ended never change, so they don't need a TTL
+    DEFAULT_CURRENT_INTERVAL_TTL = 6 * 60 * 60 # Intervals that end today or later, whose numbers still change as matches are played
+    DEFAULT_ALL_TIME_TTL = 24 * 60 * 60 # All time data, which changes as slowly as a single match moves a career's numbers
+
+    # Default number of bytes the in-memory caches can take in total, and the share of it each type of data gets
+    # Players carry stats for every query they were fetched for, so they get most of it
+    DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+    DEFAULT_MEMORY_WEIGHTS = {
+        CacheType.PLAYERS: 0.6,
+        CacheType.TEAMS: 0.25,
+        CacheType.MATCHES: 0.15,
+    }
+
+    # Number of stripes each type's cache is split into, where each stripe has its own lock so threads working on different IDs rarely wait on each other
+    # Each stripe gets an even share of its type's budget, so the biggest item a type can keep in memory is 1/NUM_STRIPES of the type's budget
+    NUM_STRIPES = 8
+
+    cache: Dict[CacheType, list[SizedLRUCache]] # Map from cache type to its stripes, where an ID is always in the same stripe
+    ttls: Dict[CacheType, float] # Map from cache type to the number of seconds its items stay fresh after they were fetched, None never goes stale
+    current_interval_ttl: float
+    all_time_ttl: float
     
     @staticmethod
     def datetime_interval_to_string(start_date: datetime, end_date: datetime) -> str:
         # If either start date or end date is not passed in, we assume the call is for all time
-        if not start_date or not end_date:
-            return ALL_TIME_INTERVAL
-        return f"{start_date.strftime(CacheManager.DATE_FORMAT)} to {end_date.strftime(CacheManager.DATE_FORMAT)}"
+        # This is the key of the interval alone, queries with other filters are keyed by the whole QueryKey
+        return QueryKey.create(start_date, end_date).get_interval_string()
     
     @staticmethod
     def interval_string_to_datetime(interval_string) -> tuple[datetime, datetime]:
-        # NEED TO H ANDLE CASE IN WHICH INTERVAL_STRING IS "ALL"
+        # All time has no dates, which is how datetime_interval_to_string is called for it
+        if interval_string == CacheManager.ALL_TIME_INTERVAL:
+            return None, None
         start_str, end_str = interval_string.split(" to ")
         start_date = datetime.strptime(start_str, CacheManager.DATE_FORMAT)
         end_date = datetime.strptime(end_str, CacheManager.DATE_FORMAT)
@@ -30,25 +142,23 @@ class CacheManager:
     
     # Merges two dataclass objects together
     # The new object is used to deep overwrite(recursively goes through dicts) any duplicate values in the old object
-    # Python passes by reference, so calling this with existing_object as the object in the cache is sufficient to editing
-    # and does not require an additional call to put the item back in the cache.
+    # The fields of existing_object are replaced rather than changed in place(merged dicts and lists are new objects), so a shallow copy
+    # of a cached object can be merged into without changing the cached one. Objects in the cache shouldn't be merged into directly
+    # since other threads may be reading them, merge a copy through CacheManager.merge instead
     @staticmethod
     def merge_dataclasses(existing_object: Any, new_object: Any):
         # Helper method to deep merge dicts, where the incoming dict's values are prioritized over the base dict
+        # Returns a new dict instead of changing base, since base can be shared with a cached object
         def deep_merge_dicts(base: dict, incoming: dict) -> dict:
+            merged = dict(base)
             for key, new_value in incoming.items():
-                if key in base:
-                    base_value = base[key]
-                    # Recurse if both are dicts
-                    if isinstance(base_value, dict) and isinstance(new_value, dict):
-                        deep_merge_dicts(base_value, new_value)
-                    else:
-                        # Overwrite non-dict or conflicting types
-                        base[key] = new_value
+                base_value = merged.get(key)
+                # Recurse if both are dicts, otherwise overwrite non-dict or conflicting types, or add keys not in base
+                if isinstance(base_value, dict) and isinstance(new_value, dict):
+                    merged[key] = deep_merge_dicts(base_value, new_value)
                 else:
-                    # Key not in base — just add
-                    base[key] = new_value
-            return base
+                    merged[key] = new_value
+            return merged
 
         if not (is_dataclass(existing_object) and is_dataclass(new_object)):
             raise ValueError("Both arguments must be dataclass instances")
@@ -58,11 +168,18 @@ class CacheManager:
             new_value = getattr(new_object, field_name)
             current_value = getattr(existing_object, field_name)
 
-            if current_value is None:
+            if new_value is None:
+                # The new object doesn't know this value(ex: a team from the rankings page has no Valve rank), so we keep the old one
+                continue
+            elif current_value is None:
                 setattr(existing_object, field_name, new_value)
             elif isinstance(current_value, list) and isinstance(new_value, list):
                 # Merge lists without duplicates, where the new values are used to overwrite the old ones
-                merged = new_value + [item for item in current_value if item not in new_value]
+                try:
+                    new_items = set(new_value) # Makes each lookup O(1) instead of a scan of the new list
+                except TypeError:
+                    new_items = new_value # Unhashable items can only be compared one by one
+                merged = new_value + [item for item in current_value if item not in new_items]
                 setattr(existing_object, field_name, merged)
             elif isinstance(current_value, dict) and isinstance(new_value, dict):
                 # Deep merge the dicts together
@@ -71,32 +188,259 @@ class CacheManager:
                 # Overwrite scalars
                 setattr(existing_object, field_name, new_value)
 
+    @staticmethod
+    def copy_dataclass(data: Any) -> Any:
+        """
+        Returns a copy of a cached object that can be changed without changing the cached one, for copy-on-write updates.
+        The object and its dict and list fields are copied, while everything else(ex: stat records, nested dicts) is shared,
+        so changes must replace those rather than change them in place(see merge_dataclasses)
+        """
+        copied = copy.copy(data)
+        if is_dataclass(data):
+            for f in fields(data):
+                value = getattr(data, f.name)
+                if isinstance(value, (dict, list)):
+                    setattr(copied, f.name, copy.copy(value))
+        return copied
+
     def __init__(self):
-        # Can also set a TTL for the cache using ttl=x for x seconds
-        self.cache = {
-            CacheType.PLAYERS: LRUCache(maxsize=500),
-            CacheType.TEAMS: LRUCache(maxsize=100),
-            CacheType.MATCHES: LRUCache(maxsize=1000),
-        }
+        # The caches are sized by bytes rather than by number of items, since a player with stats for dozens of queries takes
+        # many times the memory of one without any
+        self.cache = {}
+        self.configure_memory(CacheManager.DEFAULT_MEMORY_BUDGET)
 
-    # Retrieves a single item
-    # None is returned if there is no item corresponding to the entity_id in the table
-    def get(self, entity_type: CacheType, entity_id: int) -> Any:
-        if entity_type not in self.cache:
-            raise KeyError(f"Cache type {entity_type} not initialized.")
-        return self.cache[entity_type].get(entity_id)
+        # Persistent tier under the in-memory caches, None until enable_persistence is called
+        self.persistent_store = None
+
+        # Shared with the persistent tier, so both tiers expire items at the same time
+        self.ttls = dict(CacheManager.DEFAULT_PERSISTENT_TTLS)
+
+        self.current_interval_ttl = CacheManager.DEFAULT_CURRENT_INTERVAL_TTL
+        self.all_time_ttl = CacheManager.DEFAULT_ALL_TIME_TTL
 
-    # Sets the value of a single item
-    def set(self, entity_type: CacheType, entity_id: int, data: Any):
+    # Sets the number of bytes the in-memory caches can take in total, split between the types by weights(map from cache type to its share)
+    # Weights default to DEFAULT_MEMORY_WEIGHTS. Each type's share is split evenly between its NUM_STRIPES stripes, which caps the size of a
+    # single item in memory at its type's share / NUM_STRIPES(ex: 0.75 MB for players with a 10 MB budget and the default weights). Bigger items are only kept in the persistent tier
+    # Items already in memory are kept as long as they fit in the new budget. Shouldn't be called while other threads use the cache
+    def configure_memory(self, budget_bytes: int, weights: Dict[CacheType, float] = None):
+        weights = weights if weights else CacheManager.DEFAULT_MEMORY_WEIGHTS
+        total_weight = sum(weights.values())
+        for cache_type in CacheType:
+            stripe_bytes = int(budget_bytes * weights.get(cache_type, 0) / total_weight / CacheManager.NUM_STRIPES)
+            old_stripes = self.cache.get(cache_type, [])
+            new_stripes = [SizedLRUCache(cache_type, stripe_bytes) for _ in range(CacheManager.NUM_STRIPES)]
+            for old_stripe, new_stripe in zip(old_stripes, new_stripes):
+                new_stripe.memory_hits = old_stripe.memory_hits
+                new_stripe.persistent_hits = old_stripe.persistent_hits
+                new_stripe.misses = old_stripe.misses
+                new_stripe.evictions = old_stripe.evictions
+            self.cache[cache_type] = new_stripes
+            for old_stripe in old_stripes:
+                for entity_id, entry in old_stripe.items():
+                    self._set_in_memory(self._get_stripe(cache_type, entity_id), entity_id, entry)
+
+    def _get_stripe(self, entity_type: CacheType, entity_id: Any) -> SizedLRUCache:
         if entity_type not in self.cache:
             raise KeyError(f"Cache type {entity_type} not initialized.")
-        self.cache[entity_type][entity_id] = data
+        stripes = self.cache[entity_type]
+        return stripes[hash(entity_id) % len(stripes)]
 
-    # Gets all items of a specific type
-    def get_all(self, entity_type: CacheType) -> Dict[str, Any]:
+    @staticmethod
+    def _set_in_memory(cache: SizedLRUCache, entity_id: Any, entry: CacheEntry):
+        try:
+            cache[entity_id] = entry
+        except ValueError:
+            # The item alone is bigger than its stripe's whole budget(see configure_memory), so it's only kept in the persistent tier(if there is one)
+            cache.pop(entity_id, None)
+            global_metrics.increment("cache.too_big", cache_type=cache.cache_type)
+
+    # Sets how many seconds time specific data stays fresh for intervals that haven't ended yet and for all time data
+    # A TTL of None leaves the current one as is
+    def configure_freshness(self, current_interval_ttl: float = None, all_time_ttl: float = None):
+        if current_interval_ttl is not None:
+            self.current_interval_ttl = current_interval_ttl
+        if all_time_ttl is not None:
+            self.all_time_ttl = all_time_ttl
+
+    def is_interval_fresh(self, query_key: QueryKey, fetched_at: float) -> bool:
+        """
+        Returns whether time specific data for the query that was fetched at fetched_at(a timestamp) can still be served from the cache.
+
+        Data fetched after the end of its interval's end date is immutable, so it's always fresh. Data fetched while the interval
+        was still open(end date today or later at the time) gets current_interval_ttl, even once the interval has ended, since it
+        can be missing the interval's last matches. All time data gets all_time_ttl
+        """
+        # Data cached before fetch times were kept has no fetch time, so we can't know how old it is
+        if fetched_at is None:
+            return False
+        if not query_key.is_all_time():
+            end_of_interval = datetime.combine(query_key.end_date + timedelta(days=1), datetime.min.time()).timestamp()
+            if fetched_at >= end_of_interval:
+                return True
+        ttl = self.all_time_ttl if query_key.is_all_time() else self.current_interval_ttl
+        return time.time() - fetched_at <= ttl
+
+    # Sets how many seconds the items of each type stay fresh after they were fetched, in both tiers
+    # ttls overrides the current TTLs(DEFAULT_PERSISTENT_TTLS by default) for the cache types in it, where a TTL of None never goes stale
+    def configure_ttls(self, ttls: Dict[CacheType, float]):
+        self.ttls.update(ttls)
+
+    def _is_fresh(self, entity_type: CacheType, entry: CacheEntry) -> bool:
+        ttl = self.ttls.get(entity_type)
+        return ttl is None or time.time() - entry.fetched_at <= ttl
+
+    # Adds a persistent SQLite tier under the in-memory caches
+    # Sets are written through to it and in-memory misses are looked up in it, so a restarted process starts warm
+    # ttls are passed to configure_ttls
+    def enable_persistence(self, db_path: str, ttls: Dict[CacheType, float] = None):
+        if ttls:
+            self.configure_ttls(ttls)
+        if self.persistent_store:
+            self.persistent_store.close()
+        self.persistent_store = SQLiteCacheStore(db_path, self.ttls)
+
+    # Retrieves a single item
+    # None is returned if there is no item corresponding to the entity_id in the table, or if it was fetched longer ago than its type's TTL.
+    # Expired items stay in memory(until they're evicted or replaced) so that update can carry over what's still fresh in them(ex: stats)
+    # Cached items are shared snapshots that are never changed once they're in the cache, so they must not be changed by callers either.
+    # To change one, use update or merge, which replace it with a changed copy
+    # count is whether the lookup counts towards the hits and misses(see get_stats), which internal re-checks of an item
+    # already looked up for the same call(ex: inside a fetch after the miss that started it) turn off so each call counts once
+    def get(self, entity_type: CacheType, entity_id: int, count: bool = True) -> Any:
+        stripe = self._get_stripe(entity_type, entity_id)
+        with stripe.lock:
+            entry = stripe.get(entity_id)
+            if entry is not None and not self._is_fresh(entity_type, entry):
+                entry = None
+            if entry is not None and count:
+                stripe.memory_hits += 1
+        if entry is not None:
+            if count:
+                global_metrics.increment("cache.hit", cache_type=entity_type, tier="memory")
+            return entry.data
+
+        # Falling back to the persistent tier, and keeping what we find in memory for the next lookup
+        # This holds the stripe's update lock like writers do, so no write lands between reading the DB and keeping the item in memory.
+        # Otherwise an older item read from the DB could replace a newer one, or be kept while the newer one(ex: too big for memory) is only in the DB
+        data = None
+        if self.persistent_store:
+            with stripe.update_lock:
+                data = self._peek(stripe, entity_id) # A writer may have set it while we waited for the lock
+                if data is None:
+                    stored_entry = self.persistent_store.get_entry(entity_type, entity_id)
+                    if stored_entry is not None:
+                        data, fetched_at = stored_entry
+                        with stripe.lock:
+                            self._set_in_memory(stripe, entity_id, CacheEntry(data, fetched_at))
+            if data is not None:
+                if count:
+                    with stripe.lock:
+                        stripe.persistent_hits += 1
+                    global_metrics.increment("cache.hit", cache_type=entity_type, tier="persistent")
+                return data
+        if count:
+            with stripe.lock:
+                stripe.misses += 1
+            global_metrics.increment("cache.miss", cache_type=entity_type)
+        return data
+
+    # Sets the value of a single item, replacing the cached one
+    # The item must not be changed after it's set, see get. Setting an item also updates its size
+    # fetched_at is when the item's data was fetched(which its TTL counts from), defaulting to now
+    def set(self, entity_type: CacheType, entity_id: int, data: Any, fetched_at: float = None):
+        stripe = self._get_stripe(entity_type, entity_id)
+        with stripe.update_lock:
+            self._set(stripe, entity_type, entity_id, data, fetched_at if fetched_at is not None else time.time())
+
+    def _set(self, stripe: SizedLRUCache, entity_type: CacheType, entity_id: int, data: Any, fetched_at: float):
+        # Callers hold the stripe's update lock, so the memory and persistent tiers get writes in the same order
+        with stripe.lock:
+            self._set_in_memory(stripe, entity_id, CacheEntry(data, fetched_at))
+        if self.persistent_store:
+            self.persistent_store.set(entity_type, entity_id, data, fetched_at)
+
+    def update(self, entity_type: CacheType, entity_id: int, update_function: Callable[[Any], Any], fetched_at: float = None) -> Any:
+        """
+        Changes a cached item copy-on-write and returns the new item.
+
+        update_function is called with a copy of the cached item(see copy_dataclass), or None if there is none, and returns the item to cache.
+        The item it gets can be expired, so that what's still fresh in it can be kept. Readers keep getting the old item until the new one
+        replaces it, so they never see a half changed item, and concurrent updates of the same ID run one after the other so none of them
+        is lost. If update_function returns None, nothing is cached
+
+        fetched_at is when the new item's data was fetched, for updates that replace the item's data with newly fetched data(ex: a refetched
+        profile). None keeps the cached item's, so that adding to an item(ex: stats for another query) doesn't make the rest of it look fresh
+        """
+        stripe = self._get_stripe(entity_type, entity_id)
+        with stripe.update_lock:
+            entry = self._peek_entry(stripe, entity_id)
+            if entry is None and self.persistent_store:
+                stored_entry = self.persistent_store.get_entry(entity_type, entity_id, allow_stale=True)
+                entry = CacheEntry(*stored_entry) if stored_entry is not None else None
+            current = entry.data if entry is not None else None
+            new_data = update_function(CacheManager.copy_dataclass(current) if current is not None else None)
+            if new_data is not None:
+                if fetched_at is None:
+                    fetched_at = entry.fetched_at if entry is not None else time.time()
+                self._set(stripe, entity_type, entity_id, new_data, fetched_at)
+            return new_data
+
+    def merge(self, entity_type: CacheType, entity_id: int, new_object: Any, fetched_at: float = None) -> Any:
+        """
+        Merges new_object into the cached item(see merge_dataclasses) copy-on-write and returns the merged item.
+        new_object is cached as is if there is no cached item. fetched_at is the same as update's
+        """
+        def merge_into(cached_object: Any) -> Any:
+            if cached_object is None:
+                return new_object
+            CacheManager.merge_dataclasses(cached_object, new_object)
+            return cached_object
+        return self.update(entity_type, entity_id, merge_into, fetched_at)
+
+    # Returns the in-memory item without counting a hit or miss or marking it as recently used, None if it isn't in memory or expired
+    # For background work checking whether an item is in memory, which shouldn't skew the stats or the LRU order. See get with count=False to check the persistent tier too
+    def peek(self, entity_type: CacheType, entity_id: int) -> Any:
+        return self._peek(self._get_stripe(entity_type, entity_id), entity_id)
+
+    def _peek(self, stripe: SizedLRUCache, entity_id: Any) -> Any:
+        entry = self._peek_entry(stripe, entity_id)
+        return entry.data if entry is not None and self._is_fresh(stripe.cache_type, entry) else None
+
+    @staticmethod
+    def _peek_entry(stripe: SizedLRUCache, entity_id: Any) -> CacheEntry:
+        # Reads an entry(fresh or not) without counting it as a hit or LRUCache marking it as recently used
+        with stripe.lock:
+            return Cache.__getitem__(stripe, entity_id) if entity_id in stripe else None
+
+    # Gets all items of a specific type that are in memory and not expired, as a map from ID to item
+    # The map is a copy, so it can be iterated while the cache changes. Doesn't count as using the items for LRU eviction
+    def get_all(self, entity_type: CacheType) -> Dict[Any, Any]:
         if entity_type not in self.cache:
             raise KeyError(f"Cache type {entity_type} not initialized.")
-        return self.cache.get[entity_type]
+        items = {}
+        for stripe in self.cache[entity_type]:
+            with stripe.lock:
+                # Cache.__getitem__ reads the entry without LRUCache marking it as recently used
+                entries = [(entity_id, Cache.__getitem__(stripe, entity_id)) for entity_id in list(stripe.keys())]
+            items.update((entity_id, entry.data) for entity_id, entry in entries if self._is_fresh(entity_type, entry))
+        return items
+
+    def get_stats(self) -> Dict[CacheType, CacheStats]:
+        """
+        Returns the hit/miss/eviction counters and the current memory footprint of each type of cached data
+        """
+        return {
+            cache_type: CacheStats(
+                memory_hits=sum(stripe.memory_hits for stripe in stripes),
+                persistent_hits=sum(stripe.persistent_hits for stripe in stripes),
+                misses=sum(stripe.misses for stripe in stripes),
+                evictions=sum(stripe.evictions for stripe in stripes),
+                num_items=sum(len(stripe) for stripe in stripes),
+                size_bytes=sum(stripe.currsize for stripe in stripes),
+                max_size_bytes=sum(stripe.maxsize for stripe in stripes)
+            )
+            for cache_type, stripes in self.cache.items()
+        }
     
 # Singleton instance
 global_cache = CacheManager()
@@ -0,0 +1,116 @@
+from enums.page_types import PageType
+from util.url_util import *
+import gzip
+import hashlib
+import json
+import os
+import time
+
+class PageNotStoredError(Exception):
+    """
+    Raised in replay mode when a page that isn't in the HTML store is requested
+    """
+    pass
+
+class HTMLStore:
+    """
+    Compressed on-disk store of the raw HTML of fetched pages, separate from the cache of parsed objects.
+
+    Pages are stored by their normalized URL and the buttons clicked on them, so that the parsers can be re-run on them later
+    (ex: after HLTV changes its markup, or to backfill a new field) without fetching them again.
+
+    Each page is a gzip file whose first line is a JSON header with the URL, buttons and fetch time, followed by the HTML.
+
+    How long a stored page is served instead of fetching it again depends on its page type, since listings and stats change
+    much faster than profiles(see DEFAULT_MAX_AGES)
+    """
+    directory: str
+    max_age: float # Number of seconds a stored page stays fresh for page types not in max_ages, None means it never goes stale
+    max_ages: dict[PageType, float] # Map from page type to the number of seconds its stored pages stay fresh, None means they never go stale
+
+    # Default number of seconds stored pages of each type are served for
+    # Upcoming matches go live and get rescheduled within minutes, and rankings and stats of current intervals change with every match played
+    DEFAULT_MAX_AGES = {
+        PageType.MATCHES: 60,
+        PageType.TEAM_RANKINGS: 10 * 60,
+        PageType.PLAYER_STATS: 10 * 60,
+        PageType.TEAM: 60 * 60,
+        PageType.PLAYER: 24 * 60 * 60,
+    }
+
+    def __init__(self, directory: str, max_age: float = None, max_ages: dict[PageType, float] = None):
+        """
+        max_age: Number of seconds a stored page of any type stays fresh(ex: a long one to re-run the parsers on stored pages),
+            None keeps DEFAULT_MAX_AGES for the page types in it and never lets other pages go stale
+        max_ages: Map from page type to the number of seconds its stored pages stay fresh, on top of max_age or DEFAULT_MAX_AGES
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self.max_ages = dict(HTMLStore.DEFAULT_MAX_AGES) if max_age is None else {}
+        self.max_ages.update(max_ages or {})
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def get_key(url: str, buttons_to_click: list = []) -> str:
+        # The buttons are part of the key since clicking them can change the page's content
+        key_source = "\n".join([URLUtil.normalize_url(url)] + list(buttons_to_click))
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        # Pages are spread over subdirectories by key prefix so that no single directory gets too large
+        return os.path.join(self.directory, key[:2], f"{key}.html.gz")
+
+    def get_max_age(self, page_type: PageType = None) -> float:
+        return self.max_ages.get(page_type, self.max_age)
+
+    def get(self, url: str, buttons_to_click: list = [], allow_stale: bool = False, page_type: PageType = None) -> str:
+        """
+        Returns the stored HTML for the page, or None if it isn't stored or is older than its page type's max age(unless allow_stale is set)
+        """
+        page = self.get_page(url, buttons_to_click, allow_stale, page_type)
+        return page[0] if page else None
+
+    def get_page(self, url: str, buttons_to_click: list = [], allow_stale: bool = False, page_type: PageType = None) -> tuple[str, float]:
+        """
+        Returns the (HTML, time it was fetched at) of the stored page, or None in the same cases as get
+        """
+        path = self._get_path(HTMLStore.get_key(url, buttons_to_click))
+        if not os.path.exists(path):
+            return None
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            max_age = self.get_max_age(page_type)
+            if not allow_stale and max_age is not None and time.time() - header["fetched_at"] > max_age:
+                return None
+            return f.read(), header["fetched_at"]
+
+    def put(self, url: str, buttons_to_click: list, html: str, fetched_at: float = None):
+        # fetched_at defaults to now
+        path = self._get_path(HTMLStore.get_key(url, buttons_to_click))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        header = {
+            "url": URLUtil.normalize_url(url),
+            "buttons_to_click": list(buttons_to_click),
+            "fetched_at": fetched_at if fetched_at is not None else time.time(),
+        }
+
+        # Writing to a temporary file first so that a reader never sees a partially written page
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            f.write(html)
+        os.replace(temp_path, path)
+
+    def iter_pages(self):
+        """
+        Yields (header, html) for every stored page, where header is the JSON header described in the class docstring
+        """
+        for root, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                if not file_name.endswith(".html.gz"):
+                    continue
+                with gzip.open(os.path.join(root, file_name), "rt", encoding="utf-8") as f:
+                    header = json.loads(f.readline())
+                    yield header, f.read()
@@ -0,0 +1,88 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+import threading
+import time
+
+@dataclass
+class MetricEvent:
+    name: str # What was measured(ex: "navigation", "cache.hit")
+    kind: str # "timing" for phases, "counter" for counters, or "trace" for the summary of a whole scrape
+    value: float # Seconds for timings and traces, the increment for counters
+    url: Optional[str] = None # The URL being scraped, if the event belongs to a scrape
+    tags: dict = field(default_factory=dict) # Extra info about the event(ex: the page type, or the phases of a trace)
+
+class Metrics:
+    """
+    Hub that the scraper, fetchers, endpoints and cache report timings and counters to.
+    Nothing is recorded unless a callback is registered with add_callback, which gets every MetricEvent as it happens.
+
+    Timings of the phases of a scrape(rate limit wait, navigation, ready wait, button clicks, page source transfer, parse) are also
+    collected into a trace for the scrape, which is sent as a single "scrape" event with the phases in its tags once the scrape is done
+    """
+    callbacks: list[Callable[[MetricEvent], None]]
+    counters: dict[str, float] # Running totals of every counter
+    lock: threading.Lock
+    active_traces: threading.local # The trace of the scrape running on each thread
+
+    def __init__(self):
+        self.callbacks = []
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.active_traces = threading.local()
+
+    def add_callback(self, callback: Callable[[MetricEvent], None]):
+        self.callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[MetricEvent], None]):
+        self.callbacks.remove(callback)
+
+    def emit(self, event: MetricEvent):
+        for callback in self.callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                # A broken callback shouldn't break scraping
+                print(f"Metrics callback {callback} failed due to error {e}")
+
+    @contextmanager
+    def phase(self, name: str, url: str = None, **tags):
+        """
+        Context manager that times its body as the phase name, and adds it to the trace of the current scrape if there is one
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            trace = getattr(self.active_traces, "trace", None)
+            if trace is not None:
+                trace.append((name, duration))
+            if self.callbacks:
+                self.emit(MetricEvent(name=name, kind="timing", value=duration, url=url, tags=tags))
+
+    @contextmanager
+    def trace(self, url: str, **tags):
+        """
+        Context manager that collects the phases timed in its body(on the same thread) into one "scrape" event for the URL
+        """
+        previous_trace = getattr(self.active_traces, "trace", None)
+        self.active_traces.trace = []
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            phases = self.active_traces.trace
+            self.active_traces.trace = previous_trace
+            if self.callbacks:
+                self.emit(MetricEvent(name="scrape", kind="trace", value=duration, url=url, tags={**tags, "phases": phases}))
+
+    def increment(self, name: str, value: float = 1, **tags):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        if self.callbacks:
+            self.emit(MetricEvent(name=name, kind="counter", value=value, tags=tags))
+
+# Singleton instance
+global_metrics = Metrics()
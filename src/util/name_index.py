@@ -0,0 +1,140 @@
+from enum import Enum
+import bisect
+import re
+import sqlite3
+import threading
+import time
+
+class IndexType(Enum):
+    PLAYERS = "players" # Maps from player names and aliases to player IDs
+    TEAMS = "teams" # Maps from team names and aliases to team IDs
+    COACHES = "coaches" # Maps from coach names to coach IDs, which are separate from player IDs on HLTV
+
+class NameIndex:
+    """
+    Index from the names and aliases(ex: a player's real name, or the name slug of a URL) of teams, players and coaches to their HLTV IDs.
+
+    It's filled in as a side effect of the scrapes that already see names next to IDs(team rankings, team rosters and coaches,
+    player profiles), so that looking something up by name doesn't need a scrape of its own to find the ID.
+
+    Names are matched case-insensitively with dashes and underscores treated as spaces, so "Natus Vincere" and "natus-vincere" match.
+    Several IDs can share a name, in which case lookups return the most recently seen one first
+    """
+    # Map from index type to the map from normalized name to the map from ID to the last time that name was seen for that ID
+    entries: dict[IndexType, dict[str, dict[int, float]]]
+    sorted_names: dict[IndexType, list[str]] # The normalized names of each index type in sorted order, for prefix lookups
+    display_names: dict[IndexType, dict[int, str]] # Map from ID to the name it was last seen under, as HLTV shows it
+    connection: sqlite3.Connection # Where the index is persisted, None until enable_persistence is called
+    lock: threading.Lock
+
+    def __init__(self):
+        self.entries = {index_type: {} for index_type in IndexType}
+        self.sorted_names = {index_type: [] for index_type in IndexType}
+        self.display_names = {index_type: {} for index_type in IndexType}
+        self.connection = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        return re.sub(r"[\s\-_]+", " ", name).strip().casefold()
+
+    def enable_persistence(self, db_path: str):
+        """
+        Persists the index in the SQLite DB at db_path, loading what earlier runs put in it.
+        This can be the same DB as the persistent cache
+        """
+        with self.lock:
+            if self.connection:
+                self.connection.close()
+            self.connection = sqlite3.connect(db_path, check_same_thread=False)
+            with self.connection:
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS name_index (
+                        index_type TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        entity_id INTEGER NOT NULL,
+                        display_name TEXT NOT NULL,
+                        updated_at REAL NOT NULL,
+                        PRIMARY KEY (index_type, name, entity_id)
+                    )
+                    """
+                )
+            rows = self.connection.execute(
+                "SELECT index_type, name, entity_id, display_name, updated_at FROM name_index ORDER BY updated_at"
+            ).fetchall()
+            for index_type_value, name, entity_id, display_name, updated_at in rows:
+                self._add_entry(IndexType(index_type_value), name, entity_id, display_name, updated_at)
+
+    def _add_entry(self, index_type: IndexType, normalized_name: str, entity_id: int, display_name: str, seen_at: float):
+        # Not thread-safe, the caller holds the lock
+        ids = self.entries[index_type].get(normalized_name)
+        if ids is None:
+            ids = self.entries[index_type][normalized_name] = {}
+            bisect.insort(self.sorted_names[index_type], normalized_name)
+        ids[entity_id] = seen_at
+        self.display_names[index_type][entity_id] = display_name
+
+    def add(self, index_type: IndexType, entity_id: int, name: str, aliases: list[str] = []):
+        """
+        Records that the entity with the ID goes by the name, and also by each of the aliases
+        """
+        if entity_id is None or not name:
+            return
+        entity_id = int(entity_id)
+        now = time.time()
+        normalized_names = {NameIndex.normalize_name(alias) for alias in [name] + list(aliases) if alias}
+        with self.lock:
+            for normalized_name in normalized_names:
+                self._add_entry(index_type, normalized_name, entity_id, name, now)
+            if self.connection:
+                with self.connection:
+                    self.connection.executemany(
+                        "INSERT OR REPLACE INTO name_index (index_type, name, entity_id, display_name, updated_at) VALUES (?, ?, ?, ?, ?)",
+                        [(index_type.value, normalized_name, entity_id, name, now) for normalized_name in normalized_names]
+                    )
+
+    def get_ids(self, index_type: IndexType, name: str) -> list[int]:
+        """
+        Returns the IDs of everything of the index type that goes by the name, most recently seen first
+        """
+        with self.lock:
+            ids = self.entries[index_type].get(NameIndex.normalize_name(name), {})
+            return sorted(ids, key=ids.get, reverse=True)
+
+    def get_id(self, index_type: IndexType, name: str) -> int:
+        """
+        Returns the ID of the most recently seen entity of the index type that goes by the name, or None if no entity does
+        """
+        ids = self.get_ids(index_type, name)
+        return ids[0] if ids else None
+
+    def search(self, index_type: IndexType, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        """
+        Returns up to limit (name, ID) pairs of the index type whose name or an alias starts with the prefix, in name order.
+        The names are the ones HLTV last showed for each ID
+        """
+        normalized_prefix = NameIndex.normalize_name(prefix)
+        results = []
+        seen_ids = set()
+        with self.lock:
+            sorted_names = self.sorted_names[index_type]
+            for idx in range(bisect.bisect_left(sorted_names, normalized_prefix), len(sorted_names)):
+                normalized_name = sorted_names[idx]
+                if not normalized_name.startswith(normalized_prefix) or len(results) >= limit:
+                    break
+                for entity_id in self.entries[index_type][normalized_name]:
+                    if entity_id not in seen_ids:
+                        seen_ids.add(entity_id)
+                        results.append((self.display_names[index_type][entity_id], entity_id))
+        return results[:limit]
+
+    def close(self):
+        with self.lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+
+# Singleton instance
+global_name_index = NameIndex()
@@ -0,0 +1,33 @@
+from enums.page_types import PageType
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+# Registry of the elements each page type needs before the endpoint for it can parse the page
+# These are the same containers the endpoints look for, so once they are present the page is ready to be scraped
+# A page is ready when every one of its CSS selectors matches an element, where a selector group(ex: "div.a, div.b") matches if any of its selectors do
+page_ready_selectors: dict[PageType, list[str]] = {
+    # The list container is there even when there are no upcoming matches, in which case the page parses to no matches instead of timing out
+    PageType.MATCHES: ["div.match, div.matches-list"],
+    PageType.PLAYER: ["div.playerProfile"],
+    PageType.PLAYER_STATS: ["div.role-stats-container", "div.statistics"],
+    PageType.TEAM: ["div.teamProfile"],
+    PageType.TEAM_RANKINGS: ["table.player-ratings-table"],
+}
+
+def get_ready_selectors(page_type: PageType) -> list[str]:
+    """
+    Returns the CSS selectors that need to be present for the page type to be ready, or an empty list if the page type is None
+    """
+    if page_type is None:
+        return []
+    if page_type not in page_ready_selectors:
+        raise KeyError(f"No readiness condition registered for page type {page_type}")
+    return page_ready_selectors[page_type]
+
+def is_page_ready(soup: "BeautifulSoup", page_type: PageType) -> bool:
+    """
+    Returns whether an already fetched page has all the elements needed for its page type
+    """
+    return all(soup.select_one(selector) is not None for selector in get_ready_selectors(page_type))
@@ -0,0 +1,83 @@
+from enums.page_types import PageType
+from typing import TYPE_CHECKING
+from util.metrics import global_metrics
+import re
+
+# bs4 is only imported once the first page is parsed, so that importing the library stays fast
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, SoupStrainer
+
+# Parsing is done with Python's built-in html.parser by default
+# Fast parsing(see enable_fast_parsing) uses lxml, which is C-backed, and only builds the parts of the page each endpoint needs
+DEFAULT_PARSER = "html.parser"
+FAST_PARSER = "lxml"
+
+fast_parsing = False # Whether make_soup uses fast parsing when it isn't passed fast, set through enable_fast_parsing
+
+def _class_pattern(*class_names: str) -> re.Pattern:
+    # Matches a class attribute that has any of the class names as one of its classes
+    # A pattern is used instead of a list of names since the strainer can see the whole class attribute as one string
+    return re.compile(r"(?:^|\s)(?:" + "|".join(re.escape(class_name) for class_name in class_names) + r")(?:\s|$)")
+
+# Map from page type to the (tag names, class pattern) of the subtrees its endpoint parses,
+# where everything outside of them(ads, scripts, nav, etc) is skipped in fast parsing
+# These need to contain every element the endpoint's parse function looks for
+page_strainer_specs: dict[PageType, tuple[list[str], re.Pattern]] = {
+    PageType.MATCHES: (["div"], _class_pattern("match", "matches-list")),
+    PageType.PLAYER: (["div", "h1"], _class_pattern("playerProfile", "playerNickname")),
+    PageType.PLAYER_STATS: (["div"], _class_pattern("role-stats-container", "statistics")),
+    PageType.TEAM: (["div"], _class_pattern("teamProfile")),
+    PageType.TEAM_RANKINGS: (["table"], _class_pattern("player-ratings-table")),
+}
+
+page_strainers: dict[PageType, "SoupStrainer"] = {} # SoupStrainers built from page_strainer_specs, see get_page_strainer
+
+def get_page_strainer(page_type: PageType) -> "SoupStrainer":
+    """
+    Returns the SoupStrainer for the page type's subtrees, or None if the page type has none registered
+    """
+    if page_type not in page_strainer_specs:
+        return None
+    if page_type not in page_strainers:
+        from bs4 import SoupStrainer
+        tag_names, class_pattern = page_strainer_specs[page_type]
+        page_strainers[page_type] = SoupStrainer(tag_names, class_=class_pattern)
+    return page_strainers[page_type]
+
+def check_fast_parsing():
+    """
+    Raises an ImportError if fast parsing can't be used, since it needs lxml to be installed
+    """
+    try:
+        import lxml
+    except ImportError:
+        raise ImportError("Fast parsing needs lxml, install it with pip install lxml")
+
+def enable_fast_parsing(enabled: bool = True):
+    """
+    Turns fast parsing on or off by default for every page parsed afterwards, for pages parsed without passing fast to make_soup.
+    Scrapers pass their own setting, so this doesn't change how an HLTV client parses
+    """
+    global fast_parsing
+    if enabled:
+        check_fast_parsing()
+    fast_parsing = enabled
+
+def make_soup(page, page_type: PageType = None, fast: bool = None) -> "BeautifulSoup":
+    """
+    Returns the BeautifulSoup for a page, where page is either the page's HTML or an already parsed BeautifulSoup.
+    This lets the parse functions take a saved HTML document as well as the soup the scraper already built
+
+    With fast parsing on, the soup only has the subtrees registered for the page type in page_strainer_specs.
+    fast defaults to the setting of enable_fast_parsing
+    """
+    from bs4 import BeautifulSoup
+
+    if isinstance(page, BeautifulSoup):
+        return page
+    if fast is None:
+        fast = fast_parsing
+    with global_metrics.phase("parse", page_type=page_type, fast_parsing=fast):
+        if not fast:
+            return BeautifulSoup(page, DEFAULT_PARSER)
+        return BeautifulSoup(page, FAST_PARSER, parse_only=get_page_strainer(page_type))
@@ -0,0 +1,107 @@
+from enum import Enum
+from typing import Any
+import pickle
+import sqlite3
+import threading
+import time
+
+# Persistent tier of the cache, stored in a local SQLite DB so that cached data survives restarts
+# Every entry remembers when its data was fetched(which rewrites of the entry keep, see CacheManager.update),
+# and entries fetched longer ago than the TTL of their cache type are treated as missing
+
+# Version of the layout of the DB and the pickled entities, bumped whenever the table or cached classes change in a way old entries
+# can't be loaded from(ex: Player and Team becoming slotted). A DB written with another version is emptied when it's opened
+CACHE_FORMAT_VERSION = 3
+
+class SQLiteCacheStore:
+    db_path: str
+    ttls: dict # Map from cache type to the number of seconds its entries stay fresh, None means they never go stale
+    connection: sqlite3.Connection
+    lock: threading.Lock # sqlite3 connections can't be used by several threads at once
+
+    def __init__(self, db_path: str, ttls: dict = None):
+        self.db_path = db_path
+        self.ttls = ttls if ttls else {}
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.connection:
+            # WAL lets readers in other processes keep reading while we write
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            # The table of older versions may have other columns, so it's recreated rather than emptied
+            format_version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if format_version != CACHE_FORMAT_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS cache_entries")
+                self.connection.execute(f"PRAGMA user_version = {CACHE_FORMAT_VERSION}")
+            # The primary key doubles as the index for lookups by ID
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    cache_type TEXT NOT NULL,
+                    entity_id NOT NULL,
+                    data BLOB NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (cache_type, entity_id)
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_fetched_at ON cache_entries (cache_type, fetched_at)"
+            )
+        self.purge_expired()
+
+    def is_fresh(self, cache_type: Enum, fetched_at: float) -> bool:
+        # Whether data of the cache type fetched at fetched_at is within the type's TTL
+        ttl = self.ttls.get(cache_type)
+        return ttl is None or time.time() - fetched_at <= ttl
+
+    def get(self, cache_type: Enum, entity_id: Any) -> Any:
+        """
+        Returns the stored item, or None if there is no item for the ID or it was fetched longer ago than the cache type's TTL
+        """
+        entry = self.get_entry(cache_type, entity_id)
+        return entry[0] if entry else None
+
+    def get_entry(self, cache_type: Enum, entity_id: Any, allow_stale: bool = False) -> tuple[Any, float]:
+        """
+        Returns the (item, time its data was fetched at) of the stored item, or None in the same cases as get(unless allow_stale is set)
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT data, fetched_at FROM cache_entries WHERE cache_type = ? AND entity_id = ?",
+                (cache_type.value, entity_id)
+            ).fetchone()
+        if row is None:
+            return None
+
+        data, fetched_at = row
+        if not allow_stale and not self.is_fresh(cache_type, fetched_at):
+            return None
+        return pickle.loads(data), fetched_at
+
+    def set(self, cache_type: Enum, entity_id: Any, data: Any, fetched_at: float = None):
+        # fetched_at defaults to now
+        serialized_data = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (cache_type, entity_id, data, fetched_at) VALUES (?, ?, ?, ?)",
+                (cache_type.value, entity_id, serialized_data, fetched_at if fetched_at is not None else time.time())
+            )
+
+    def purge_expired(self):
+        """
+        Deletes every entry whose data was fetched longer ago than the TTL of its cache type
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            for cache_type, ttl in self.ttls.items():
+                if ttl is None:
+                    continue
+                self.connection.execute(
+                    "DELETE FROM cache_entries WHERE cache_type = ? AND fetched_at < ?",
+                    (cache_type.value, now - ttl)
+                )
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
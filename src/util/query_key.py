@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from enums.maps import Maps
+from enums.match_types import MatchType
+import sys
+
+@dataclass(frozen=True)
+class QueryKey:
+    """
+    Canonical key of the filters of a time specific query(the stats pages and team rankings), used to key time_specific_data
+    in the cache and to build the query string of the page's URL, so that the two never disagree.
+
+    Two queries for the same data always get equal keys: dates are compared by day, a missing start or end date means all time,
+    and maps are an unordered set where no maps means all maps. Keys are hashable, and str(key) is the canonical string
+    stored in time_specific_data. Keys without match type or maps filters are just their interval string, ex: "2025-04-09 to 2025-07-09"
+    """
+    start_date: date # None for all time
+    end_date: date # None for all time
+    match_type: MatchType # None for all match types
+    maps: frozenset[Maps] # Empty for all maps
+
+    DATE_FORMAT = "%Y-%m-%d"
+    ALL_TIME_INTERVAL = "ALL_TIME"
+
+    @staticmethod
+    def create(start_date: datetime = None, end_date: datetime = None, match_type: MatchType = None, maps: list[Maps] = None) -> "QueryKey":
+        """
+        Builds the key from the arguments the endpoints take, where either date being missing means all time
+        """
+        if not start_date or not end_date:
+            start_date, end_date = None, None
+        else:
+            start_date = start_date.date() if isinstance(start_date, datetime) else start_date
+            end_date = end_date.date() if isinstance(end_date, datetime) else end_date
+        return QueryKey(start_date, end_date, match_type, frozenset(maps or []))
+
+    @staticmethod
+    def from_string(key_string: str) -> "QueryKey":
+        """
+        Builds the key back from its string(see __str__), ex: to export the keys of time_specific_data
+        """
+        interval_string, *filter_strings = key_string.split(" | ")
+        start_date, end_date = None, None
+        if interval_string != QueryKey.ALL_TIME_INTERVAL:
+            start_string, end_string = interval_string.split(" to ")
+            start_date = datetime.strptime(start_string, QueryKey.DATE_FORMAT).date()
+            end_date = datetime.strptime(end_string, QueryKey.DATE_FORMAT).date()
+
+        match_type = None
+        maps = []
+        for filter_string in filter_strings:
+            name, value = filter_string.split("=", 1)
+            if name == "matchType":
+                match_type = MatchType(value)
+            elif name == "maps":
+                maps = [Maps(map_value) for map_value in value.split(",")]
+            else:
+                raise ValueError(f"Unknown filter {name} in query key {key_string}")
+        return QueryKey.create(start_date, end_date, match_type, maps)
+
+    def is_all_time(self) -> bool:
+        return self.start_date is None
+
+    def get_interval_string(self) -> str:
+        if self.is_all_time():
+            return QueryKey.ALL_TIME_INTERVAL
+        return f"{self.start_date.strftime(QueryKey.DATE_FORMAT)} to {self.end_date.strftime(QueryKey.DATE_FORMAT)}"
+
+    def get_sorted_maps(self) -> list[Maps]:
+        return sorted(self.maps, key=lambda map: map.value)
+
+    def get_query_params(self) -> list[tuple[str, str]]:
+        """
+        Returns the HLTV query parameters for the filters, where filters that are for everything aren't specified at all
+        """
+        params = []
+        if not self.is_all_time():
+            params.append(("startDate", self.start_date.strftime(QueryKey.DATE_FORMAT)))
+            params.append(("endDate", self.end_date.strftime(QueryKey.DATE_FORMAT)))
+        if self.match_type:
+            params.append(("matchType", self.match_type.value))
+        for map in self.get_sorted_maps():
+            params.append(("maps", map.value))
+        return params
+
+    def __str__(self) -> str:
+        key_string = self.get_interval_string()
+        if self.match_type:
+            key_string += f" | matchType={self.match_type.value}"
+        if self.maps:
+            key_string += f" | maps={','.join(map.value for map in self.get_sorted_maps())}"
+        # Interned so that the thousands of cached entities with stats for the same query share one key string
+        return sys.intern(key_string)
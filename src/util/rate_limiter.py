@@ -1,35 +1,259 @@
+from contextlib import contextmanager
+import json
+import os
+import threading
 import time
-from collections import deque
 
-# IMPORTANT: WE NEED TO MAKE THIS WEIGHTED SINCE NOT EVERY OPERATION MAKES THE SAME NUMBER OF CALLS/SCRAPES
-# either that or we need each individual scrape to call this
+# Token bucket that refills at rate tokens per second, and holds at most burst tokens
+# Each call takes its weight in tokens out of the bucket. Callers reserve their tokens right away and then wait, so the bucket
+# can go negative, which queues later callers up behind earlier ones in the order they reserved
+class TokenBucket:
+    rate: float
+    burst: float
+    tokens: float
+    last_refill: float
+
+    def __init__(self, rate: float, burst: float = None):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        self.rate = rate
+        self.burst = burst if burst else max(1.0, rate) # By default one second's worth of calls can be made at once
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+
+    def reserve(self, weight: float, now: float) -> float:
+        """
+        Takes weight tokens out of the bucket and returns the number of seconds until they are available.
+        Not thread-safe, the caller holds the lock
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        self.tokens -= weight
+        return max(0.0, -self.tokens / self.rate)
+
+    def available(self, now: float) -> float:
+        # Number of tokens in the bucket right now, negative when callers are queued up
+        return min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+
+    def has_available(self, weight: float, now: float) -> bool:
+        # Whether weight tokens can be taken without waiting, where a weight over burst only needs a full bucket since it could never fit
+        return self.available(now) >= min(weight, self.burst)
 
 # The purpose of this class is to limit the rate at which we make calls to APIs so that we don't get throttled
+# It is shared by every thread of a scraper, so the limit is a global ceiling no matter how many browsers are fetching at once
+#
+# Each call has a weight, so operations that make several requests(ex: a navigation plus button clicks) cost their true amount,
+# and can have a route(the URL path), which also has to fit in the budget of the route's prefix when one is set(ex: "/stats")
 class RateLimitedExecutor:
-    max_calls_per_period: int
-    period: float
-    call_times: deque
+    bucket: TokenBucket # Global budget that every call goes through
+    route_buckets: dict[str, TokenBucket] # Map from URL path prefix to the extra budget of the routes under it
+    lock: threading.Lock
 
-    def __init__(self, max_calls_per_period, period):
-        self.max_calls_per_period = max_calls_per_period # Fractional not supported
-        self.period = period # In seconds
-        self.call_times = deque()
+    def __init__(
+            self,
+            max_calls_per_period: float,
+            period: float = 1,
+            burst: float = None,
+            route_limits: dict[str, tuple[float, float]] = None
+    ):
+        """
+        max_calls_per_period: Number of calls(by weight) allowed per period, which can be fractional(ex: 0.3 calls per second)
+        period: In seconds
+        burst: Max weight of calls that can be made at once after being idle, defaults to max_calls_per_period(and at least 1)
+        route_limits: Map from URL path prefix to (max calls per second, burst) for calls to routes under that prefix, where burst can be None
+        """
+        self.bucket = TokenBucket(max_calls_per_period / period, burst if burst else max(1.0, max_calls_per_period))
+        self.route_buckets = {
+            prefix: TokenBucket(route_calls_per_second, route_burst)
+            for prefix, (route_calls_per_second, route_burst) in (route_limits or {}).items()
+        }
+        self.lock = threading.Lock()
 
-    def _apply_rate_limit(self):
-        now = time.monotonic()
+    def _get_route_prefix(self, route: str) -> str:
+        # The longest prefix of the route that has its own budget, or None if no prefix has one
+        if not route:
+            return None
+        matching_prefixes = [prefix for prefix in self.route_buckets if route.startswith(prefix)]
+        if not matching_prefixes:
+            return None
+        return max(matching_prefixes, key=len)
 
-        # Remove older timestamps from the deque
-        while self.call_times and now - self.call_times[0] > self.period:
-            self.call_times.popleft()
+    def _reserve(self, weight: float = 1, route: str = None) -> float:
+        """
+        Reserves weight tokens in the global budget and the route's budget, and returns the number of seconds the caller needs to wait for them.
+        Tokens are reserved under the lock but waited on outside of it, so threads queue up behind each other without holding the lock while sleeping
+        """
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.bucket.reserve(weight, now)
+            route_prefix = self._get_route_prefix(route)
+            if route_prefix:
+                wait_time = max(wait_time, self.route_buckets[route_prefix].reserve(weight, now))
+            return wait_time
 
-        # If we have made max calls in this period, just wait
-        if len(self.call_times) >= self.max_calls_per_period:
-            wait_time = self.period - (now - self.call_times[0])
-            time.sleep(wait_time)
+    @staticmethod
+    def _try_reserve_buckets(buckets: list[TokenBucket], weight: float, now: float) -> bool:
+        # Reserves weight tokens in every bucket if they all have them available right now, and reserves nothing otherwise
+        if not all(bucket.has_available(weight, now) for bucket in buckets):
+            return False
+        for bucket in buckets:
+            bucket.reserve(weight, now)
+        return True
+
+    def try_acquire(self, weight: float = 1, route: str = None) -> bool:
+        """
+        Takes the tokens of a call of the input weight to the input route if they're available right now, without waiting.
+        Returns whether they were taken, which is never the case while other callers are waiting for tokens
+        """
+        with self.lock:
+            route_prefix = self._get_route_prefix(route)
+            buckets = [self.bucket, self.route_buckets[route_prefix]] if route_prefix else [self.bucket]
+            return RateLimitedExecutor._try_reserve_buckets(buckets, weight, time.monotonic())
 
-        self.call_times.append(now)
+    def available(self) -> float:
+        """
+        Number of tokens left in the global budget right now, negative when callers are waiting for tokens
+        """
+        with self.lock:
+            return self.bucket.available(time.monotonic())
+
+    def acquire(self, weight: float = 1, route: str = None):
+        """
+        Blocks until a call of the input weight to the input route is allowed
+        """
+        wait_time = self._reserve(weight, route)
+        if wait_time > 0:
+            time.sleep(wait_time)
 
     # Calls the function using the rate limiter
     def call(self, func, *args, **kwargs):
-        self._apply_rate_limit()
-        return func(*args, **kwargs)
\ No newline at end of file
+        return self.call_weighted(1, None, func, *args, **kwargs)
+
+    # Calls the function using the rate limiter, where the call costs weight tokens and counts towards the route's budget
+    def call_weighted(self, weight: float, route: str, func, *args, **kwargs):
+        self.acquire(weight, route)
+        return func(*args, **kwargs)
+
+    def close(self):
+        # Releases what the rate limiter holds on to(ex: the shared state file), nothing for an in-process rate limiter
+        pass
+
+# Rate limiter whose budget is shared by every process on the host that uses the same state file
+# Each process building its own RateLimitedExecutor would get the full budget to itself, so several workers together would go over it
+#
+# The token buckets are kept in the state file and updated under an exclusive file lock, so reserving tokens is atomic across processes.
+# Times in the state file are wall clock times, since monotonic clocks aren't comparable between processes
+class SharedRateLimitedExecutor(RateLimitedExecutor):
+    state_path: str
+    state_file: object # Kept open for the lifetime of the rate limiter, locking it is what coordinates the processes
+
+    def __init__(
+            self,
+            state_path: str,
+            max_calls_per_period: float,
+            period: float = 1,
+            burst: float = None,
+            route_limits: dict[str, tuple[float, float]] = None
+    ):
+        """
+        state_path: Path of the file holding the shared state, every process that should share the budget needs to use the same path
+        The other arguments are the same as RateLimitedExecutor's, and every process should use the same ones
+        """
+        super().__init__(max_calls_per_period, period, burst, route_limits)
+        self.state_path = state_path
+        if not os.path.exists(state_path):
+            open(state_path, "a", encoding="utf-8").close()
+        self.state_file = open(state_path, "r+", encoding="utf-8")
+
+    @contextmanager
+    def _locked_state(self):
+        """
+        Context manager that holds the lock on the state file and yields its state, which is written back on exit.
+        The thread lock is also held, since file locks don't exclude threads of the same process from each other
+        """
+        with self.lock:
+            _lock_file(self.state_file)
+            try:
+                self.state_file.seek(0)
+                content = self.state_file.read()
+                state = json.loads(content) if content else {}
+                yield state
+                self.state_file.seek(0)
+                self.state_file.truncate()
+                self.state_file.write(json.dumps(state))
+                self.state_file.flush()
+            finally:
+                _unlock_file(self.state_file)
+
+    @staticmethod
+    def _load_bucket(bucket: TokenBucket, bucket_state: dict, now: float):
+        # Buckets that aren't in the state yet start full
+        if bucket_state:
+            bucket.tokens = bucket_state["tokens"]
+            bucket.last_refill = bucket_state["last_refill"]
+        else:
+            bucket.tokens = bucket.burst
+            bucket.last_refill = now
+
+    def _reserve(self, weight: float = 1, route: str = None) -> float:
+        with self._locked_state() as state:
+            now = time.time()
+            SharedRateLimitedExecutor._load_bucket(self.bucket, state.get("global"), now)
+            wait_time = self.bucket.reserve(weight, now)
+            state["global"] = {"tokens": self.bucket.tokens, "last_refill": self.bucket.last_refill}
+
+            route_prefix = self._get_route_prefix(route)
+            if route_prefix:
+                route_bucket = self.route_buckets[route_prefix]
+                route_states = state.setdefault("routes", {})
+                SharedRateLimitedExecutor._load_bucket(route_bucket, route_states.get(route_prefix), now)
+                wait_time = max(wait_time, route_bucket.reserve(weight, now))
+                route_states[route_prefix] = {"tokens": route_bucket.tokens, "last_refill": route_bucket.last_refill}
+            return wait_time
+
+    def try_acquire(self, weight: float = 1, route: str = None) -> bool:
+        with self._locked_state() as state:
+            now = time.time()
+            SharedRateLimitedExecutor._load_bucket(self.bucket, state.get("global"), now)
+            buckets = [self.bucket]
+            route_prefix = self._get_route_prefix(route)
+            if route_prefix:
+                route_bucket = self.route_buckets[route_prefix]
+                SharedRateLimitedExecutor._load_bucket(route_bucket, state.get("routes", {}).get(route_prefix), now)
+                buckets.append(route_bucket)
+            if not RateLimitedExecutor._try_reserve_buckets(buckets, weight, now):
+                return False
+
+            state["global"] = {"tokens": self.bucket.tokens, "last_refill": self.bucket.last_refill}
+            if route_prefix:
+                state.setdefault("routes", {})[route_prefix] = {"tokens": route_bucket.tokens, "last_refill": route_bucket.last_refill}
+            return True
+
+    def available(self) -> float:
+        with self._locked_state() as state:
+            now = time.time()
+            SharedRateLimitedExecutor._load_bucket(self.bucket, state.get("global"), now)
+            return self.bucket.available(now)
+
+    def close(self):
+        self.state_file.close()
+
+# Exclusive locks on a whole open file, using fcntl on Linux/Mac and msvcrt on Windows
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(file):
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(file):
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(file):
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(file):
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
@@ -1,10 +1,34 @@
-from bs4 import BeautifulSoup
+from concurrent.futures import Future, ThreadPoolExecutor
+from enums.page_types import PageType
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+import os
+import time
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+    from endpoints.prefetch import PrefetchScheduler
+from util.cookie_jar import *
+from util.fetchers import *
+from util.html_store import *
+from util.metrics import *
+from util.page_readiness import *
+from util.parsing import *
 from util.rate_limiter import *
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-import undetected_chromedriver as uc
+from util.single_flight import SingleFlight
+
+class PageDumpSink:
+    """
+    Page sink that writes the prettified HTML of the last scraped page to a file, which is handy when debugging a parser
+    """
+    path: str
+
+    def __init__(self, path: str = "page_dump.html"):
+        self.path = path
+
+    def __call__(self, url: str, soup: "BeautifulSoup"):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(soup.prettify())
 
 # we'll probably need a file per endpoint that we want to provide since each endpoint will take a lot of work
 # this scraper should just provide the generic things that are used, such as accessing a webpage, finding what it needs on that webpage, etc
@@ -12,76 +36,226 @@ import undetected_chromedriver as uc
 
 class HLTVScraper:
     rate_limiter: RateLimitedExecutor
-    driver: uc.Chrome
+    http_fetcher: HTTPFetcher # None when the HTTP fetcher is disabled
+    browser_pool: BrowserPool
+    executor: ThreadPoolExecutor # Thread pool that concurrent fetches are dispatched to, see submit
+    html_store: HTMLStore # Store of the raw HTML of fetched pages, None when pages aren't stored
+    replay: bool # When set, pages are only served from the HTML store and never fetched
+    page_sinks: list # Callables that get the URL and soup of every page get_website returns(ex: PageDumpSink)
+    cookie_jar: CookieJar # Where the browser sessions' cookies are kept across runs, None when they aren't kept
+    consent_given: bool # Whether the cookie pop-up was already accepted, in which case the browser doesn't try to click it
+    page_flight: SingleFlight # Coalesces concurrent get_website calls for the same page, keyed by normalized URL, buttons and refresh
+    entity_flight: SingleFlight # Coalesces concurrent endpoint calls for the same entity(ex: a player's stats), keyed by entity type and ID
+    fast_parsing: bool # Whether this scraper's pages are parsed with fast parsing, see util/parsing.py
+    prefetcher: "PrefetchScheduler" # Gets the entities parsed by the endpoints to prefetch what's related to them, None when not prefetching
     cookie_text: str = "Allow all cookies" # Pop-up for site cookies
+    consent_cookie_name: str = "CookieConsent" # Cookie that HLTV sets once the cookie pop-up is accepted
     default_url: str = "https://www.hltv.org"
 
+    # Default number of threads in the pool, so batches of calls served over HTTP run concurrently even with a single browser
+    DEFAULT_NUM_WORKERS: int = 4
+
+    # Rate limiter weights of the parts of a fetch, so that a browser navigation plus N button clicks costs 1 + N
+    navigation_weight: float = 1
+    button_click_weight: float = 1
+
     # TODO: set a default value for calls_per_second once we figure out decent value
-    def __init__(self, max_calls_per_second: int):
-        self.rate_limiter = RateLimitedExecutor(max_calls_per_second, 1)
-
-        # Browser options
-        options = Options()
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-crash-reporter")
-        options.add_argument("--disable-popup-blocking")
-        options.add_argument("--disable-blink-features=AutomationControlled")  # Reduces automation detection
-        options.add_argument("--disable-dev-shm-usage")  # Fixes crash issues in Docker/Linux environments
-
-        # options.add_argument("--headless") # Runs the Chrome browser without popping up. Currently doesn't work since Cloudflare will block it
-        # options.add_argument(
-        #     "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
-        # )
-
-        # Browser
-        self.driver = uc.Chrome(options=options)
-        self.driver.maximize_window()
-
-    def get_website(self, url: str, buttons_to_click: list = []) -> BeautifulSoup:
+    def __init__(
+            self,
+            max_calls_per_second: float,
+            use_http_fetcher: bool = True,
+            num_browsers: int = 1,
+            num_workers: int = None,
+            html_store: HTMLStore = None,
+            replay: bool = False,
+            rate_limit_burst: float = None,
+            route_rate_limits: dict[str, tuple[float, float]] = None,
+            shared_rate_limit_path: str = None,
+            page_sinks: list = None,
+            browser_profile_dir: str = None,
+            fast_parsing: bool = False
+    ):
+        """
+        max_calls_per_second: The max number of pages fetched per second(can be fractional), across all fetchers and threads
+        use_http_fetcher: Whether to try fetching pages over plain HTTP before falling back to the browser
+        num_browsers: The number of browsers that can load pages at the same time
+        num_workers: The number of threads in the pool that concurrent fetches are dispatched to, defaults to DEFAULT_NUM_WORKERS(or num_browsers if that's more)
+        html_store: Where to store the raw HTML of every fetched page. Fresh pages in it are served without fetching them again
+        replay: Serve pages only from html_store(regardless of their age) and raise PageNotStoredError for anything else
+        rate_limit_burst: The max number of calls that can be made at once after being idle, defaults to max_calls_per_second
+        route_rate_limits: Map from URL path prefix(ex: "/stats") to (max calls per second, burst) for the pages under it, on top of the global limit
+        shared_rate_limit_path: Path of a state file to share the rate limit through with every other process on the host using the same path.
+            None gives this scraper a rate limit of its own
+        page_sinks: Callables that get called with the URL and soup of every page the scraper returns
+        browser_profile_dir: Directory to keep the browser profiles and cookie jar(Cloudflare clearance, cookie consent) in across runs.
+            None starts every run with fresh browsers that have to pass Cloudflare and accept cookies again
+        fast_parsing: Parse this scraper's pages with lxml and only build the parts of each page its endpoint needs.
+            This only applies to this scraper, other scrapers in the process keep their own setting
+        """
+        if replay and not html_store:
+            raise ValueError("Replay mode needs an HTML store to replay pages from")
+        if fast_parsing:
+            check_fast_parsing()
+
+        num_workers = num_workers if num_workers else max(HLTVScraper.DEFAULT_NUM_WORKERS, num_browsers)
+        self.html_store = html_store
+        self.page_sinks = page_sinks if page_sinks else []
+        self.replay = replay
+        self.fast_parsing = fast_parsing
+        if shared_rate_limit_path:
+            self.rate_limiter = SharedRateLimitedExecutor(
+                shared_rate_limit_path,
+                max_calls_per_second,
+                1,
+                rate_limit_burst,
+                route_rate_limits
+            )
+        else:
+            self.rate_limiter = RateLimitedExecutor(max_calls_per_second, 1, rate_limit_burst, route_rate_limits)
+        self.cookie_jar = CookieJar(os.path.join(browser_profile_dir, "cookies.json")) if browser_profile_dir else None
+        self.consent_given = self.cookie_jar.has_cookie(self.consent_cookie_name) if self.cookie_jar else False
+
+        self.http_fetcher = HTTPFetcher(pool_size=max(num_workers, 10)) if use_http_fetcher else None
+        if self.http_fetcher and self.cookie_jar and self.cookie_jar.get_cookies():
+            # The saved clearance only works with the user agent it was issued to
+            self.http_fetcher.load_browser_session(self.cookie_jar.get_cookies(), self.cookie_jar.user_agent)
+        self.browser_pool = BrowserPool(num_browsers, browser_profile_dir, self.cookie_jar) # Browsers are launched on first use
+        self.executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="hltv-scraper")
+        self.page_flight = SingleFlight("page")
+        self.entity_flight = SingleFlight("entity")
+        self.prefetcher = None # Set by PrefetchScheduler.start
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        """
+        Runs func(*args, **kwargs) on the scraper's thread pool and returns the Future for its result.
+        Every fetch made by func still goes through the shared rate limiter, so this only overlaps the time spent waiting on page loads
+
+        func should not itself wait on futures from submit, since it could be waiting on a thread that is waiting for it
+        """
+        return self.executor.submit(func, *args, **kwargs)
+
+    def get_website(self, url: str, buttons_to_click: list = [], page_type: PageType = None, refresh: bool = False) -> "BeautifulSoup":
         """
         This method accesses the input URL and also hits the necessary buttons to access dynamically generated content
 
+        The page is served from the HTML store if it has a fresh copy of it(see HTMLStore.DEFAULT_MAX_AGES), and fetched otherwise(see _fetch)
+
         url: The URL to access
         buttons_to_click: The list of buttons to click, specified by their name in the order that we want them to be clicked in
+        page_type: The type of the page, used to know when the page is ready(see page_readiness.py). None waits for the whole page to load
+        refresh: Always fetch the page instead of serving it from the HTML store(except in replay mode), for when what was parsed
+            from an earlier copy of the page went stale(ex: cached stats past their TTL) or the caller polls for changes
 
         Output is a BeautifulSoup containing the scraped content
+
+        The time spent in each phase of the scrape is reported to global_metrics, see metrics.py
+
+        Threads asking for the same page(same normalized URL and buttons) while it's being fetched wait for that fetch and get the
+        same soup instead of fetching it again, so the soup must not be changed by callers
         """
-        print(f"Scraping the webpage {url}")
+        return self.get_page(url, buttons_to_click, page_type, refresh)[0]
 
-        # Getting the site
-        self.rate_limiter.call(self.driver.get, url)
+    def get_page(self, url: str, buttons_to_click: list = [], page_type: PageType = None, refresh: bool = False) -> tuple["BeautifulSoup", float]:
+        """
+        Same as get_website, but returns the (soup, time the page was fetched at), where the time is older than now when the page
+        came from the HTML store. For endpoints that record when their data was fetched
+        """
+        # Refreshes aren't coalesced with calls that can be served a stored page
+        page_key = (URLUtil.normalize_url(url), tuple(buttons_to_click), refresh)
+        return self.page_flight.do(page_key, self._get_page, url, buttons_to_click, page_type, refresh)
 
-        # Waits for the initial page to fully load
-        WebDriverWait(self.driver, 30).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
-        time.sleep(2) # Additional wait for JS elements to laod
+    def _get_page(self, url: str, buttons_to_click: list, page_type: PageType, refresh: bool) -> tuple["BeautifulSoup", float]:
+        with global_metrics.trace(url, page_type=page_type):
+            stored_page = None
+            if self.html_store and (self.replay or not refresh):
+                stored_page = self.html_store.get_page(url, buttons_to_click, allow_stale=self.replay, page_type=page_type)
+                if stored_page is None and self.replay:
+                    raise PageNotStoredError(f"The webpage {url} is not in the HTML store, and replay mode never fetches pages")
 
-        for button_text in buttons_to_click:
-            try:
-                # Wait for and click the button by visible text
-                button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, f'//button[contains(text(), "{button_text}")]'))
-                )
-                button.click()
-                time.sleep(2) # Wait for the DOM to update after click
-            except Exception as e:
-                # If button click fails, just print a message saying so
-                # print(f"Failed to click button {button_text} due to error {e}")
-                print(f"Failed to click button \"{button_text}\"")
-
-        soup = BeautifulSoup(self.driver.page_source, "html.parser")
-
-        # Printing for testing, comment this out when not needed
-        with open("page_dump.html", "w", encoding="utf-8") as f:
-            f.write(soup.prettify())
+            if stored_page is not None:
+                global_metrics.increment("html_store.hit")
+                html, fetched_at = stored_page
+                soup = make_soup(html, page_type, self.fast_parsing)
+            else:
+                print(f"Scraping the webpage {url}")
+                fetched_at = time.time()
+                html, soup = self._fetch(url, buttons_to_click, page_type)
+                if self.html_store:
+                    self.html_store.put(url, buttons_to_click, html, fetched_at)
+                print(f"Successfully scraped webpage {url}")
 
-        print(f"Successfully scraped webpage {url}")
+        for page_sink in self.page_sinks:
+            page_sink(url, soup)
 
-        return soup
+        return soup, fetched_at
     
+    def _fetch(self, url: str, buttons_to_click: list, page_type: PageType) -> tuple[str, "BeautifulSoup"]:
+        """
+        Fetches the page over HTTP when possible, and through the browser if the HTTP fetcher is disabled or gets challenged by Cloudflare
+
+        Output is the page's HTML and the BeautifulSoup parsed from it
+        """
+        route = urlsplit(url).path
+        soup = None
+        if self.http_fetcher:
+            try:
+                # Buttons aren't clicked over HTTP, so the fetch only costs the navigation
+                with global_metrics.phase("rate_limit_wait", url, weight=self.navigation_weight):
+                    self._acquire(self.navigation_weight, route)
+                html = self.http_fetcher.fetch(url, buttons_to_click, page_type)
+                soup = make_soup(html, page_type, self.fast_parsing)
+                if not is_page_ready(soup, page_type):
+                    print(f"HTTP fetch of {url} is missing the content for page type {page_type}, falling back to the browser")
+                    global_metrics.increment("http_fetch.fallback", reason="not_ready")
+                    soup = None
+            except CloudflareChallengeError:
+                print(f"Cloudflare challenged the HTTP fetch of {url}, falling back to the browser")
+                global_metrics.increment("http_fetch.fallback", reason="cloudflare_challenge")
+            except HTTPFetchError as e:
+                print(f"{e}, falling back to the browser")
+                global_metrics.increment("http_fetch.fallback", reason="request_error")
+
+        if soup is None:
+            # Once cookies are accepted the pop-up doesn't come back, so we don't spend a click(or its rate limit budget) on it
+            if self.consent_given:
+                buttons_to_click = [button for button in buttons_to_click if button != self.cookie_text]
+
+            # Tokens are taken before checking out a browser, so a call waiting for them(ex: a prefetch waiting for leftover tokens)
+            # doesn't hold a browser that other calls could be using meanwhile
+            weight = self.navigation_weight + self.button_click_weight * len(buttons_to_click)
+            with global_metrics.phase("rate_limit_wait", url, weight=weight):
+                self._acquire(weight, route)
+            with self.browser_pool.checkout() as browser:
+                html = browser.fetch(url, buttons_to_click, page_type)
+
+                # The browser got through Cloudflare, so its cookies and user agent let the HTTP fetcher through for the following pages
+                cookies = browser.get_cookies()
+                user_agent = browser.get_user_agent()
+                if self.http_fetcher:
+                    self.http_fetcher.load_browser_session(cookies, user_agent)
+                if self.cookie_jar:
+                    self.cookie_jar.update(cookies, user_agent)
+                if any(cookie["name"] == self.consent_cookie_name for cookie in cookies):
+                    self.consent_given = True
+            soup = make_soup(html, page_type, self.fast_parsing)
+
+        return html, soup
+
+    def _acquire(self, weight: float, route: str):
+        # Prefetches only take tokens the user's calls leave over, so they never make a user's call queue behind them
+        prefetcher = self.prefetcher
+        if prefetcher and prefetcher.is_prefetch_thread():
+            prefetcher.acquire_leftover(weight, route)
+        else:
+            self.rate_limiter.acquire(weight, route)
+
     def end_scraping(self):
-        # Quitting the driver once everything finishes
-        self.driver.quit()
+        # Closing the thread pool and all the fetchers once everything finishes
+        self.executor.shutdown(wait=True)
+        if self.http_fetcher:
+            # Cloudflare can refresh its cookies on any response, so the HTTP session's latest ones are kept for the next run
+            if self.cookie_jar:
+                self.cookie_jar.update(self.http_fetcher.get_cookies())
+            self.http_fetcher.close()
+        self.browser_pool.close()
+        self.rate_limiter.close()
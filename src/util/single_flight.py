@@ -0,0 +1,49 @@
+from concurrent.futures import Future
+from typing import Any, Hashable
+from util.metrics import global_metrics
+import threading
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one: the first caller for a key runs the call, and callers that come in
+    while it's running wait for it and get its result(or its exception) instead of making the call again.
+
+    Only calls that overlap are coalesced, a call that comes in after the previous one for the key returned runs again.
+    Used by HLTVScraper to fetch a page once when several threads ask for it at the same time, keyed by normalized URL,
+    and by the endpoints to fetch an entity once, keyed by its type and ID
+    """
+    name: str # Reported as the group of the single_flight.coalesced counter
+    in_flight: dict[Hashable, Future] # Map from key to the Future of the call running for it
+    lock: threading.Lock
+
+    def __init__(self, name: str):
+        self.name = name
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def do(self, key: Hashable, func, *args, **kwargs) -> Any:
+        """
+        Returns func(*args, **kwargs), or the result of the call already running for the key if there is one.
+        func must not call do with the same key, since it would wait on itself
+        """
+        with self.lock:
+            future = self.in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self.in_flight[key] = future
+
+        if not is_leader:
+            global_metrics.increment("single_flight.coalesced", group=self.name)
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
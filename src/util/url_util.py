@@ -1,28 +1,34 @@
-from enums.maps import Maps
-from enums.match_types import MatchType
-from datetime import datetime
+from util.query_key import QueryKey
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import re
+
+# Paths of HLTV pages that end in a name slug after the ID. HLTV ignores the slug, so two URLs that only differ in it are the same page
+slugged_path_pattern = re.compile(r"^(/(?:stats/)?(?:player|players|team|teams|coach)/\d+)(?:/[^/]*)?$")
 
 class URLUtil:
-    def get_end_of_url(
-        start_date: datetime,
-        end_date: datetime,
-        match_type: MatchType = None,
-        maps: list[Maps] = []
-    ) -> str:
+    @staticmethod
+    def get_end_of_url(query_key: QueryKey, extra_params: list[tuple[str, str]] = None) -> str:
         """
-        Constructs the string to attach to the end of the url to customize the options for certain HLTV pages
+        Constructs the string to attach to the end of the url to customize the options for certain HLTV pages,
+        from the query's filters and any extra parameters for the page(ex: the ranking filter of the team rankings)
+
+        Returns an empty string when there is nothing to add, since the page then defaults to everything
         """
-        url = "?"
-        if start_date and end_date:
-            url += f"startDate={start_date.strftime('%Y-%m-%d')}&endDate={end_date.strftime('%Y-%m-%d')}"
-        if match_type: # When match_type is null, we make the query for all match types, which is done by not specifying any arguments in the url
-            url += f"&matchType={match_type.value}"
-        if maps: # When maps is null, we make the query for all maps, which is done by not specifying any arguments in the url
-            for map in maps:
-                url += f"&maps={map.value}"
-        
-        if url == "?":
+        params = query_key.get_query_params() + list(extra_params or [])
+        if not params:
             return ""
-        else:
-            return url
+        return "?" + "&".join(f"{name}={value}" for name, value in params)
 
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """
+        Returns the canonical form of an HLTV URL, so that URLs for the same page map to the same string.
+        The scheme and host are lowercased, the name slug after an ID is dropped, query parameters are sorted and the fragment is removed
+        """
+        parts = urlsplit(url)
+        path = parts.path.rstrip("/") or "/"
+        slugged_path_match = slugged_path_pattern.match(path)
+        if slugged_path_match:
+            path = slugged_path_match.group(1)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))